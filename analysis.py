@@ -1,115 +1,341 @@
 import numpy as np
 import pandas as pd
-from collections import Counter
-import random
+import math
+import threading
+from collections import deque
+
+from draw_matrix import DrawMatrix, NumberIndex, ODD_MASK, popcount, numbers_to_masks, match_tickets, prize_ranks
+
+
+class KeyedCache:
+    """마지막 키의 결과 하나만 보관하는 캐시 (같은 키의 계산은 동시에 한 번만 수행)
+
+    (키, 결과) 튜플을 통째로 바꿔 넣으므로 적중한 읽기는 잠금 없이 처리한다.
+    """
+
+    _EMPTY = object()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entry = (self._EMPTY, None)
+
+    def get(self, key, build):
+        """key가 마지막 키와 같으면 보관된 결과, 아니면 build()로 새로 계산해 교체"""
+        entry_key, value = self._entry
+        if entry_key == key:
+            return value
+        with self._lock:
+            entry_key, value = self._entry
+            if entry_key != key:
+                value = build()
+                self._entry = (key, value)
+            return value
+
+    def peek(self):
+        """마지막으로 보관된 결과 (없으면 None)"""
+        return self._entry[1]
+
+
+# 데이터 버전별 분석 결과 캐시 (예측 번호는 요청마다 새로 생성하므로 제외)
+_analysis_cache = KeyedCache()
+_cooccurrence_cache = KeyedCache()
+_prefix_cache = KeyedCache()
+
+
+RANGE_LABELS = ['1-10', '11-20', '21-30', '31-40', '41-45']
+# 당첨금 규칙 (1등 당첨금 정보가 없으면 20억으로 가정, 2등은 1등의 1/4)
+TICKET_PRICE = 1000
+DEFAULT_PRIZE_1ST = 2000000000
+FIXED_PRIZES = {3: 1500000, 4: 50000, 5: 5000}
+
+# 동시 출현 분석에서 보관하는 상위 조합 수
+TOP_COMBOS_MAX = 100
+
+# 번호 -> RANGE_LABELS 인덱스
+_RANGE_INDEX = [0] + [(n - 1) // 10 for n in range(1, 46)]
+_RANGE_GROUP = np.array(_RANGE_INDEX)
+# 예측 번호 한 세트에서 구간별 최대 개수
+_RANGE_CAP = np.array([3, 3, 3, 3, 2])
+
+
+def as_matrix(draws):
+    """회차 dict 목록 또는 DrawMatrix를 DrawMatrix로 변환"""
+    if isinstance(draws, DrawMatrix):
+        return draws
+    return DrawMatrix.from_draws(draws)
 
 
 def build_dataframe(draws):
     """당첨 데이터를 DataFrame으로 변환"""
-    rows = []
-    for d in draws:
-        row = {
-            'draw_no': d['draw_no'],
-            'date': d['date'],
-            'n1': d['numbers'][0],
-            'n2': d['numbers'][1],
-            'n3': d['numbers'][2],
-            'n4': d['numbers'][3],
-            'n5': d['numbers'][4],
-            'n6': d['numbers'][5],
-            'bonus': d['bonus'],
-        }
-        rows.append(row)
-    return pd.DataFrame(rows)
+    m = as_matrix(draws)
+    df = pd.DataFrame({
+        'draw_no': m.draw_no.astype(np.int64),
+        'date': [m.draw(i)['date'] for i in range(len(m))],
+    })
+    for i in range(6):
+        df[f'n{i + 1}'] = m.numbers[:, i].astype(np.int64)
+    df['bonus'] = m.bonus.astype(np.int64)
+    return df
 
 
 def get_all_numbers(draws):
     """모든 당첨번호를 1차원 리스트로 반환"""
-    numbers = []
-    for d in draws:
-        numbers.extend(d['numbers'])
-    return numbers
+    return as_matrix(draws).numbers.ravel().tolist()
+
+
+def number_counts(draws):
+    """번호별 출현 횟수 배열 (인덱스 0은 사용하지 않음)"""
+    return np.bincount(as_matrix(draws).numbers.ravel(), minlength=46)
 
 
 def frequency_analysis(draws):
     """번호별 출현 빈도 분석 (1~45)"""
-    all_nums = get_all_numbers(draws)
-    counter = Counter(all_nums)
-    return {n: counter.get(n, 0) for n in range(1, 46)}
+    counts = number_counts(draws).tolist()
+    return {n: counts[n] for n in range(1, 46)}
 
 
 def recent_frequency(draws, n=50):
     """최근 N회차 번호별 출현 빈도"""
-    recent = draws[-n:] if len(draws) >= n else draws
-    all_nums = get_all_numbers(recent)
-    counter = Counter(all_nums)
-    return {num: counter.get(num, 0) for num in range(1, 46)}
+    return frequency_analysis(as_matrix(draws)[-n:])
+
+
+def _hot_cold_from_counts(counts):
+    # 동률이면 작은 번호가 앞 (안정 정렬)
+    order = np.argsort(-np.asarray(counts[1:46]), kind='stable') + 1
+    ranked = [{'number': int(num), 'count': int(counts[num])} for num in order]
+    return ranked[:9], ranked[-9:]
 
 
 def hot_cold_numbers(draws, n=50):
     """핫/콜드 번호 (최근 N회차 기준)"""
-    freq = recent_frequency(draws, n)
-    sorted_nums = sorted(freq.items(), key=lambda x: x[1], reverse=True)
-    hot = [{'number': num, 'count': cnt} for num, cnt in sorted_nums[:9]]
-    cold = [{'number': num, 'count': cnt} for num, cnt in sorted_nums[-9:]]
-    return hot, cold
+    return _hot_cold_from_counts(number_counts(as_matrix(draws)[-n:]))
+
+
+def _hist_percentile(cum, q):
+    """간격 히스토그램 누적합으로 np.percentile(기본 linear 방식)과 같은 값을 계산"""
+    index = (cum[-1] - 1) * (q / 100)
+    lo = math.floor(index)
+    hi = min(lo + 1, cum[-1] - 1)
+    # k번째(0부터) 작은 간격 = 누적합이 k보다 커지는 첫 간격
+    a, b = (int(np.searchsorted(cum, k, side='right')) for k in (lo, hi))
+    t = index - lo
+    return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+
+def _gap_rows(total, last_seen, last_draw, gap_hist):
+    """번호별 미출현 간격 통계 (gap_hist[n][g]: 간격 g가 나온 횟수)
+
+    간격을 펼치지 않고 히스토그램에서 바로 계산하므로 회차 수가 아니라 최대 간격에 비례한다.
+    """
+    rows = []
+    for n in range(1, 46):
+        hist = np.asarray(gap_hist[n], dtype=np.int64)
+        cum = np.cumsum(hist)
+        current = total if last_seen[n] is None else total - 1 - last_seen[n]
+        row = {'number': n, 'current_gap': current, 'last_draw': last_draw[n],
+               'mean_gap': None, 'max_gap': None, 'p50': None, 'p90': None, 'current_percentile': None}
+        if len(cum) and cum[-1]:
+            count = int(cum[-1])
+            shorter = int(cum[min(current, len(cum)) - 1]) if current > 0 else 0
+            row.update({
+                'mean_gap': round(int(np.dot(np.arange(len(hist)), hist)) / count, 1),
+                'max_gap': int(np.flatnonzero(hist)[-1]),
+                'p50': round(float(_hist_percentile(cum, 50)), 1),
+                'p90': round(float(_hist_percentile(cum, 90)), 1),
+                # 지난 간격 중 현재 간격보다 짧았던 비율
+                'current_percentile': round(shorter / count * 100, 1),
+            })
+        rows.append(row)
+    return rows
+
+
+def _number_positions(m):
+    """번호별 출현 위치 배열 목록 (인덱스 0은 비어 있음, 각 배열은 회차 순)"""
+    flat = m.numbers.ravel()
+    positions = np.argsort(flat, kind='stable') // 6
+    return np.split(positions, np.cumsum(np.bincount(flat, minlength=46))[:-1])
+
+
+def _gap_state(m, groups=None):
+    """번호별 마지막 출현 위치/회차 번호와 간격 히스토그램"""
+    groups = _number_positions(m) if groups is None else groups
+    last_seen = [int(g[-1]) if len(g) else None for g in groups]
+    last_draw = [None if i is None else int(m.draw_no[i]) for i in last_seen]
+    gap_hist = [np.bincount(np.diff(g) - 1).tolist() if len(g) > 1 else [] for g in groups]
+    return last_seen, last_draw, gap_hist
+
+
+def gap_analysis(draws):
+    """번호별 미출현 간격 분석 (마지막 출현 이후 회차 수, 과거 간격 분포)
+
+    간격은 두 번 출현 사이에 끼어 있는 회차 수 (연속 출현이면 0)
+    """
+    m = as_matrix(draws)
+    return _gap_rows(len(m), *_gap_state(m))
+
+
+class PrefixStats:
+    """회차 누적 합 배열 (임의 구간 통계를 뺄셈 한 번으로 계산)
+
+    앞에서부터 i개 회차에 대한 값을 i번째 행에 둔다 (0번째 행은 회차 없음).
+    - counts: (N+1, 46) 번호별 출현 횟수
+    - sum_total/sum_sq/sum_min/sum_max: 당첨번호 합계의 누적 합, 제곱 합, 최소, 최대
+    - odd_total/combos/consecutive: 홀수 개수 합, 홀짝 조합별 횟수 (N+1, 7), 연속번호 포함 회차 수
+    """
+
+    def __init__(self, draws):
+        m = as_matrix(draws)
+        self.matrix = m
+        self.total = len(m)
+        counts = np.zeros((self.total + 1, 46), dtype=np.int32)
+        np.put_along_axis(counts[1:], m.numbers.astype(np.intp), 1, axis=1)
+        np.cumsum(counts, axis=0, out=counts)
+        self.counts = counts
+
+        sums = m.sums()
+        odds = _odd_counts(m)
+        self.sum_total = self._cumulative(sums)
+        self.sum_sq = self._cumulative(sums * sums)
+        self.sum_min = np.minimum.accumulate(sums)
+        self.sum_max = np.maximum.accumulate(sums)
+        self.odd_total = self._cumulative(odds)
+        combos = np.zeros((self.total + 1, 7), dtype=np.int32)
+        combos[np.arange(1, self.total + 1), odds] = 1
+        self.combos = np.cumsum(combos, axis=0)
+        self.combo_first_seen = [int(np.argmax(odds == k)) if np.any(odds == k) else None for k in range(7)]
+        self.consecutive = self._cumulative(_has_consecutive(m).astype(np.int64))
+        self.positions = _number_positions(m)
+
+    @staticmethod
+    def _cumulative(values):
+        out = np.zeros(len(values) + 1, dtype=np.int64)
+        np.cumsum(values, out=out[1:])
+        return out
+
+    def index_of(self, draw_no):
+        """draw_no 회차까지 포함하는 회차 수"""
+        return int(np.searchsorted(self.matrix.draw_no, draw_no, side='right'))
+
+    def summary(self, i, recent_n=50):
+        """앞에서부터 i개 회차(1 이상)만 있었을 때의 get_base_analysis() 결과
+
+        간격 분석을 뺀 항목은 누적 배열의 i번째 행만 읽으므로 회차 수와 무관하게 일정한 시간에 계산된다.
+        간격 분석은 번호별 출현 위치를 i 이전까지 잘라 다시 세므로 i에 비례하는 시간이 든다.
+        """
+        m = self.matrix
+        counts = self.counts[i]
+        recent = self.window_counts(max(i - recent_n, 0), i)
+        hot, cold = _hot_cold_from_counts(recent)
+        number_total = i * 6
+        odd_total = int(self.odd_total[i])
+        sum_total = int(self.sum_total[i])
+        # 분산 = (i * 제곱합 - 합^2) / i^2 (정수 연산으로 오차 없이 계산)
+        variance = (i * int(self.sum_sq[i]) - sum_total * sum_total) / (i * i)
+        combo_counts = self.combos[i].tolist()
+        first_seen = [k if k is not None and k < i else None for k in self.combo_first_seen]
+        groups = [g[:np.searchsorted(g, i)] for g in self.positions]
+        consecutive = int(self.consecutive[i])
+        return {
+            'total_draws': i,
+            'latest_draw': m.draw(i - 1),
+            'frequency': {n: int(counts[n]) for n in range(1, 46)},
+            'recent_frequency': {n: int(recent[n]) for n in range(1, 46)},
+            'hot_numbers': hot,
+            'cold_numbers': cold,
+            'gaps': _gap_rows(i, *_gap_state(m, groups)),
+            'range_analysis': {k: round(v / number_total * 100, 1) for k, v in zip(RANGE_LABELS, _range_totals(counts))},
+            'odd_even': {
+                'avg_odd': round(np.float64(odd_total / i), 2),
+                'avg_even': round(np.float64((number_total - odd_total) / i), 2),
+                'combos': _odd_even_combos(combo_counts, first_seen),
+            },
+            'consecutive': {
+                'consecutive_draws': consecutive,
+                'total_draws': i,
+                'percentage': round(consecutive / i * 100, 1),
+            },
+            'sum_stats': {
+                'avg': round(np.float64(sum_total / i), 1),
+                'min': int(self.sum_min[i - 1]),
+                'max': int(self.sum_max[i - 1]),
+                'std': round(np.float64(math.sqrt(max(variance, 0))), 1),
+            },
+        }
+
+    def window_counts(self, start, stop):
+        """start~stop-1 위치 회차의 번호별 출현 횟수"""
+        return self.counts[stop] - self.counts[start]
+
+    def rolling(self, window, stride=1):
+        """window 회차 구간별 번호 출현 횟수 (마지막 구간이 최신 회차에서 끝나도록 stride 간격)
+
+        (구간 끝 위치 배열, (구간 수, 46) 횟수 배열) 반환
+        """
+        ends = np.arange(self.total, window - 1, -stride)[::-1]
+        return ends, self.counts[ends] - self.counts[ends - window]
+
+
+def rolling_frequency(draws, window=50, stride=1, prefix=None):
+    """구간 크기 window 의 번호별 출현 빈도 추이"""
+    prefix = PrefixStats(draws) if prefix is None else prefix
+    ends, counts = prefix.rolling(window, stride)
+    return {
+        'window': window,
+        'stride': stride,
+        'draw_no': prefix.matrix.draw_no[ends - 1].tolist(),
+        'frequency': {n: counts[:, n].tolist() for n in range(1, 46)},
+    }
+
+
+def _range_totals(counts):
+    counts = np.asarray(counts)
+    return [int(counts[1:11].sum()), int(counts[11:21].sum()), int(counts[21:31].sum()),
+            int(counts[31:41].sum()), int(counts[41:46].sum())]
 
 
 def range_analysis(draws):
     """번호 구간별 출현 비율"""
-    all_nums = get_all_numbers(draws)
-    ranges = {
-        '1-10': 0, '11-20': 0, '21-30': 0, '31-40': 0, '41-45': 0
-    }
-    for n in all_nums:
-        if n <= 10:
-            ranges['1-10'] += 1
-        elif n <= 20:
-            ranges['11-20'] += 1
-        elif n <= 30:
-            ranges['21-30'] += 1
-        elif n <= 40:
-            ranges['31-40'] += 1
-        else:
-            ranges['41-45'] += 1
-    total = len(all_nums)
-    return {k: round(v / total * 100, 1) for k, v in ranges.items()}
+    m = as_matrix(draws)
+    totals = _range_totals(number_counts(m))
+    total = m.numbers.size
+    return {k: round(v / total * 100, 1) for k, v in zip(RANGE_LABELS, totals)}
 
 
-def odd_even_analysis(draws):
-    """홀짝 비율 분석"""
-    results = []
-    for d in draws:
-        odds = sum(1 for n in d['numbers'] if n % 2 == 1)
-        evens = 6 - odds
-        results.append({'draw_no': d['draw_no'], 'odd': odds, 'even': evens})
+def _odd_counts(m):
+    return popcount(m.masks & ODD_MASK)
 
-    # 평균 홀짝 비율
-    avg_odd = np.mean([r['odd'] for r in results])
-    avg_even = np.mean([r['even'] for r in results])
 
-    # 홀짝 조합별 빈도
-    combo_counter = Counter(f"{r['odd']}:{r['even']}" for r in results)
-    combos = [{'combo': k, 'count': v} for k, v in
-              sorted(combo_counter.items(), key=lambda x: x[1], reverse=True)]
+def _odd_even_combos(combo_counts, first_seen):
+    # Counter와 같이 처음 등장한 순서를 유지한 채 빈도 내림차순 정렬
+    present = [k for k in range(7) if combo_counts[k] > 0]
+    present.sort(key=lambda k: first_seen[k])
+    present.sort(key=lambda k: combo_counts[k], reverse=True)
+    return [{'combo': f'{k}:{6 - k}', 'count': int(combo_counts[k])} for k in present]
+
+
+def odd_even_analysis(draws):
+    """홀짝 비율 분석"""
+    odds = _odd_counts(as_matrix(draws))
+    combo_counts = np.bincount(odds, minlength=7)
+    first_seen = [int(np.argmax(odds == k)) for k in range(7)]
 
     return {
-        'avg_odd': round(avg_odd, 2),
-        'avg_even': round(avg_even, 2),
-        'combos': combos
+        'avg_odd': round(np.mean(odds), 2),
+        'avg_even': round(np.mean(6 - odds), 2),
+        'combos': _odd_even_combos(combo_counts, first_seen),
     }
 
 
+def _has_consecutive(m):
+    # n, n+1 이 모두 나왔으면 마스크와 1비트 민 마스크가 겹침
+    return (m.masks & (m.masks >> np.uint64(1))) != 0
+
+
 def consecutive_analysis(draws):
     """연속번호 패턴 분석"""
-    has_consecutive = 0
-    for d in draws:
-        nums = sorted(d['numbers'])
-        for i in range(len(nums) - 1):
-            if nums[i + 1] - nums[i] == 1:
-                has_consecutive += 1
-                break
-    total = len(draws)
+    m = as_matrix(draws)
+    has_consecutive = int(np.count_nonzero(_has_consecutive(m)))
+    total = len(m)
     return {
         'consecutive_draws': has_consecutive,
         'total_draws': total,
@@ -119,7 +345,7 @@ def consecutive_analysis(draws):
 
 def sum_analysis(draws):
     """당첨번호 합계 분석"""
-    sums = [sum(d['numbers']) for d in draws]
+    sums = as_matrix(draws).sums()
     return {
         'avg': round(np.mean(sums), 1),
         'min': int(np.min(sums)),
@@ -128,49 +354,226 @@ def sum_analysis(draws):
     }
 
 
-def predict_numbers(draws, num_sets=5):
+def _one_hot(m):
+    """(N, 46) 회차별 번호 출현 행렬 (0/1)"""
+    x = np.zeros((len(m), 46), dtype=np.float32)
+    np.put_along_axis(x, m.numbers.astype(np.intp), 1, axis=1)
+    return x
+
+
+def pair_cooccurrence(draws, chunk=100000):
+    """번호 쌍 동시 출현 횟수 (46x46, 대각선은 번호별 출현 횟수)
+
+    출현 행렬 X에 대해 X.T @ X 로 계산한다 (메모리를 위해 회차를 나눠 누적).
+    """
+    m = as_matrix(draws)
+    pairs = np.zeros((46, 46), dtype=np.int64)
+    for start in range(0, len(m), chunk):
+        x = _one_hot(m[start:start + chunk])
+        pairs += np.rint(x.T @ x).astype(np.int64)
+    return pairs
+
+
+def triple_counts(draws, index=None):
+    """모든 3개 번호 조합(a<b<c)의 동시 출현 횟수
+
+    번호별 출현 회차 비트셋에서 (a, b) 쌍 비트셋과 c 비트셋의 AND 를 popcount 한다.
+    (조합 배열 (14190, 3), 횟수 배열 (14190,)) 을 사전 순으로 반환
     """
-    가중 확률 기반 번호 예측
+    index = NumberIndex(as_matrix(draws)) if index is None else index
+    rows = index.main
+    combos = []
+    counts = []
+    for a in range(1, 44):
+        for b in range(a + 1, 45):
+            pair = rows[a] & rows[b]
+            counts.append(popcount(rows[b + 1:] & pair).sum(axis=1))
+            combos.append(np.column_stack([np.full(45 - b, a), np.full(45 - b, b), np.arange(b + 1, 46)]))
+    return np.concatenate(combos), np.concatenate(counts)
+
+
+def _top_combos(combos, counts, k):
+    # 횟수 내림차순, 동률이면 사전 순
+    order = np.argsort(-counts, kind='stable')[:k]
+    return [{'numbers': combos[i].tolist(), 'count': int(counts[i])} for i in order]
+
+
+def cooccurrence_analysis(draws, index=None, k=TOP_COMBOS_MAX):
+    """번호 쌍 동시 출현 행렬과 자주 함께 나온 쌍/3개 조합 상위 k개"""
+    m = as_matrix(draws)
+    pairs = pair_cooccurrence(m)
+    a, b = np.triu_indices(46, 1)
+    valid = a > 0
+    pair_combos = np.column_stack([a[valid], b[valid]])
+    triple_combos, triples = triple_counts(m, index)
+    return {
+        'total_draws': len(m),
+        # 번호 쌍이 한 회차에 함께 나올 확률 = (6*5)/(45*44)
+        'expected_pair': round(len(m) * 30 / 1980, 2),
+        'pairs': pairs[1:, 1:].tolist(),
+        'top_pairs': _top_combos(pair_combos, pairs[a[valid], b[valid]], k),
+        'top_triples': _top_combos(triple_combos, triples, k),
+    }
+
+
+def prediction_weights(total_freq, recent_freq, w_random):
+    """번호별 예측 가중치 (행마다 출현 횟수를 최댓값으로 정규화)
+
     - 전체 출현 빈도 (30%)
     - 최근 50회차 출현 빈도 (40%)
     - 구간 균형 보정 (20%)
     - 랜덤성 (10%)
     """
-    total_freq = frequency_analysis(draws)
-    recent_freq = recent_frequency(draws, 50)
+    def normalize(freq):
+        top = freq.max(axis=-1, keepdims=True)
+        return np.divide(freq, top, out=np.zeros(freq.shape), where=top > 0)
 
-    # 가중치 계산
-    weights = {}
-    for n in range(1, 46):
-        w_total = total_freq[n] / max(total_freq.values()) if max(total_freq.values()) > 0 else 0
-        w_recent = recent_freq[n] / max(recent_freq.values()) if max(recent_freq.values()) > 0 else 0
-        w_range = 1.0  # 기본 구간 가중치
-        w_random = random.random()
+    w_range = 1.0  # 기본 구간 가중치
+    return (normalize(total_freq) * 0.3) + (normalize(recent_freq) * 0.4) + (w_range * 0.2) + (w_random * 0.1)
 
-        weights[n] = (w_total * 0.3) + (w_recent * 0.4) + (w_range * 0.2) + (w_random * 0.1)
 
-    predictions = []
-    for _ in range(num_sets):
-        # 가중치에 약간의 랜덤성 추가
-        adjusted = {n: w + random.uniform(0, 0.15) for n, w in weights.items()}
-        sorted_nums = sorted(adjusted.items(), key=lambda x: x[1], reverse=True)
+def select_sets(weights, rng):
+    """가중치 행마다 약간의 랜덤성을 더해 높은 순으로 구간 상한 안에서 6개 선택"""
+    adjusted = weights + rng.uniform(0, 0.15, weights.shape)
+    numbers = np.argsort(-adjusted, axis=1, kind='stable') + 1
+    # 정렬된 순서에서 각 번호가 자기 구간의 몇 번째인지 (구간별 누적 개수)
+    groups = _RANGE_GROUP[numbers]
+    rank = np.cumsum(groups[..., None] == np.arange(len(RANGE_LABELS)), axis=1)
+    rank = np.take_along_axis(rank, groups[..., None], axis=2)[..., 0]
+    allowed = rank <= _RANGE_CAP[groups]
+    selected = allowed & (np.cumsum(allowed, axis=1) <= 6)
+    return np.sort(numbers[selected].reshape(-1, 6), axis=1)
 
-        # 구간 균형을 고려하여 선택
-        selected = []
-        range_counts = {'1-10': 0, '11-20': 0, '21-30': 0, '31-40': 0, '41-45': 0}
 
-        for num, _ in sorted_nums:
-            if len(selected) >= 6:
-                break
-            r = get_range(num)
-            max_per_range = 3 if r != '41-45' else 2
-            if range_counts[r] < max_per_range:
-                selected.append(num)
-                range_counts[r] += 1
+def predict_batches(draws, batches, num_sets=5, seed=None):
+    """predict_numbers() 결과 batches 묶음을 한 번에 생성 ((batches, num_sets, 6) 배열)"""
+    m = as_matrix(draws)
+    rng = np.random.default_rng(seed)
+    # 랜덤성 항목은 묶음마다 새로 뽑는다
+    weights = prediction_weights(number_counts(m)[1:], number_counts(m[-50:])[1:], rng.random((batches, 45)))
+    return select_sets(np.repeat(weights, num_sets, axis=0), rng).reshape(batches, num_sets, 6)
 
-        predictions.append(sorted(selected[:6]))
 
-    return predictions
+def predict_numbers(draws, num_sets=5, seed=None):
+    """
+    가중 확률 기반 번호 예측 (seed를 주면 같은 결과를 재현)
+    - 가중치는 prediction_weights() 참고
+    - 구간당 최대 3개 (41-45는 2개)
+    """
+    return predict_batches(draws, 1, num_sets, seed)[0].tolist()
+
+
+def prize_table(m):
+    """(6, N) 등수별 당첨금 표 (0행은 낙첨)"""
+    prize_1st = np.where(m.prize_1st > 0, m.prize_1st, DEFAULT_PRIZE_1ST)
+    table = np.zeros((6, len(m)))
+    table[1] = prize_1st
+    table[2] = prize_1st / 4
+    for rank, prize in FIXED_PRIZES.items():
+        table[rank] = prize
+    return table
+
+
+def simulate_tickets(draws, tickets, limit=100):
+    """티켓(들)을 모든 회차에 샀다고 가정한 당첨 시뮬레이션
+
+    tickets는 parse_tickets()로 검증된 (T, 6) 배열.
+    """
+    m = as_matrix(draws)
+    t_masks = numbers_to_masks(tickets)
+    hits, bonus_hit = match_tickets(t_masks, m.masks, m.bonus)
+    ranks = prize_ranks(hits, bonus_hit)
+
+    table = prize_table(m)
+    prizes = table[ranks, np.arange(len(m))]
+
+    rank_counts = np.bincount(ranks.ravel(), minlength=6)
+    total_spent = len(m) * len(tickets) * TICKET_PRICE
+    total_winnings = float(prizes.sum())
+
+    # 당첨 내역 (등수 → 회차 순)
+    t_idx, d_idx = np.nonzero(ranks)
+    order = np.lexsort((t_idx, m.draw_no[d_idx], ranks[t_idx, d_idx]))
+    matches = []
+    for k in order[:limit]:
+        t, i = int(t_idx[k]), int(d_idx[k])
+        draw = m.draw(i)
+        ticket = tickets[t].tolist()
+        draw['ticket'] = t
+        draw['matched'] = [n for n in draw['numbers'] if n in ticket]
+        draw['bonus_match'] = bool(bonus_hit[t, i])
+        draw['rank'] = int(ranks[t, i])
+        draw['prize'] = float(prizes[t, i])
+        matches.append(draw)
+
+    per_ticket = []
+    for t in range(len(tickets)):
+        counts = np.bincount(ranks[t], minlength=6)
+        per_ticket.append({
+            'numbers': tickets[t].tolist(),
+            'rank_counts': {str(r): int(counts[r]) for r in range(1, 6)},
+            'winnings': float(prizes[t].sum()),
+        })
+
+    return {
+        'total_draws': len(m),
+        'first_draw': int(m.draw_no[0]) if len(m) else None,
+        'last_draw': int(m.draw_no[-1]) if len(m) else None,
+        'ticket_count': len(tickets),
+        'rank_counts': {str(r): int(rank_counts[r]) for r in range(1, 6)},
+        'total_spent': total_spent,
+        'total_winnings': total_winnings,
+        'roi': round(total_winnings / total_spent * 100, 1) if total_spent > 0 else 0.0,
+        'match_total': int(len(t_idx)),
+        'matches': matches,
+        'tickets': per_ticket,
+    }
+
+
+def iter_check_results(draws, tickets, chunk_cells=4000000):
+    """대량 티켓을 (티켓 x 회차) 칸 수 기준으로 나눠 당첨 여부를 차례로 계산
+
+    각 청크마다 시작 인덱스, 티켓별 최고 등수, 당첨 내역(티켓, 회차, 등수),
+    등수별 개수, 당첨금 합계를 담은 dict를 반환한다.
+    """
+    m = as_matrix(draws)
+    t_masks = numbers_to_masks(tickets)
+    table = prize_table(m)
+    step = max(1, chunk_cells // max(len(m), 1))
+    for start in range(0, len(tickets), step):
+        hits, bonus_hit = match_tickets(t_masks[start:start + step], m.masks, m.bonus)
+        ranks = prize_ranks(hits, bonus_hit)
+        best = np.where(ranks > 0, ranks, 6).min(axis=1) % 6
+        t_idx, d_idx = np.nonzero(ranks)
+        yield {
+            'start': start,
+            'best_rank': best,
+            'wins': [(start + t, int(m.draw_no[d]), int(ranks[t, d])) for t, d in zip(t_idx.tolist(), d_idx.tolist())],
+            'rank_counts': np.bincount(ranks.ravel(), minlength=6),
+            'winnings': float(table[ranks, np.arange(len(m))].sum()),
+        }
+
+
+def check_tickets(draws, tickets):
+    """대량 티켓 당첨 확인 결과 (티켓별 최고 등수 + 전체 집계)"""
+    m = as_matrix(draws)
+    best = []
+    wins = []
+    rank_counts = np.zeros(6, dtype=np.int64)
+    winnings = 0.0
+    for chunk in iter_check_results(m, tickets):
+        best.extend(chunk['best_rank'].tolist())
+        wins.extend({'ticket': t, 'draw_no': d, 'rank': r} for t, d, r in chunk['wins'])
+        rank_counts += chunk['rank_counts']
+        winnings += chunk['winnings']
+    return {
+        'draws': m.draw_no.tolist(),
+        'ticket_count': len(tickets),
+        'rank_counts': {str(r): int(rank_counts[r]) for r in range(1, 6)},
+        'total_winnings': winnings,
+        'best_rank': best,
+        'wins': wins,
+    }
 
 
 def get_range(n):
@@ -186,19 +589,223 @@ def get_range(n):
         return '41-45'
 
 
-def get_full_analysis(draws):
-    """전체 분석 결과 반환"""
-    hot, cold = hot_cold_numbers(draws)
+def get_base_analysis(draws):
+    """예측 번호를 제외한 통계 분석 결과 반환"""
+    m = as_matrix(draws)
+    hot, cold = hot_cold_numbers(m)
     return {
-        'total_draws': len(draws),
-        'latest_draw': draws[-1] if draws else None,
-        'frequency': frequency_analysis(draws),
-        'recent_frequency': recent_frequency(draws, 50),
+        'total_draws': len(m),
+        'latest_draw': m.draw(-1) if len(m) else None,
+        'frequency': frequency_analysis(m),
+        'recent_frequency': recent_frequency(m, 50),
         'hot_numbers': hot,
         'cold_numbers': cold,
-        'range_analysis': range_analysis(draws),
-        'odd_even': odd_even_analysis(draws),
-        'consecutive': consecutive_analysis(draws),
-        'sum_stats': sum_analysis(draws),
-        'predictions': predict_numbers(draws),
+        'gaps': gap_analysis(m),
+        'range_analysis': range_analysis(m),
+        'odd_even': odd_even_analysis(m),
+        'consecutive': consecutive_analysis(m),
+        'sum_stats': sum_analysis(m),
     }
+
+
+def get_full_analysis(draws):
+    """전체 분석 결과 반환"""
+    m = as_matrix(draws)
+    result = get_base_analysis(m)
+    result['predictions'] = predict_numbers(m)
+    return result
+
+
+class IncrementalStats:
+    """새 회차를 O(1)로 반영하는 누적 통계 상태
+
+    get_base_analysis()와 같은 결과를 summary()로 반환한다.
+    만들어진 뒤에는 바뀌지 않으며 extend()는 새 회차를 반영한 새 상태를 돌려준다.
+    """
+
+    def __init__(self, recent_n=50):
+        self.recent_n = recent_n
+        self.total = 0
+        self.counts = [0] * 46
+        self.recent = deque()
+        self.recent_counts = [0] * 46
+        self.range_counts = [0] * len(RANGE_LABELS)
+        self.combo_counts = [0] * 7
+        self.combo_first_seen = [None] * 7
+        self.odd_total = 0
+        self.consecutive = 0
+        # 합계 통계 (평균/표준편차는 Welford 방식)
+        self.sum_total = 0
+        self.sum_mean = 0.0
+        self.sum_m2 = 0.0
+        self.sum_min = None
+        self.sum_max = None
+        # 번호별 마지막 출현 위치/회차와 간격 히스토그램
+        self.last_seen = [None] * 46
+        self.last_draw = [None] * 46
+        self.gap_hist = [[] for _ in range(46)]
+        self.latest_draw = None
+
+    @classmethod
+    def from_matrix(cls, draws, recent_n=50):
+        """전체 이력으로 상태를 한 번에 초기화 (벡터 연산)"""
+        m = as_matrix(draws)
+        stats = cls(recent_n)
+        total = len(m)
+        if total == 0:
+            return stats
+        counts = number_counts(m)
+        odds = _odd_counts(m)
+        sums = m.sums()
+        start = max(total - recent_n, 0)
+
+        stats.total = total
+        stats.counts = counts.tolist()
+        stats.recent = deque(m.numbers[start:].tolist())
+        stats.recent_counts = number_counts(m[start:]).tolist()
+        stats.range_counts = _range_totals(counts)
+        stats.combo_counts = np.bincount(odds, minlength=7).tolist()
+        stats.combo_first_seen = [int(np.argmax(odds == k)) if stats.combo_counts[k] else None for k in range(7)]
+        stats.odd_total = int(odds.sum())
+        stats.consecutive = int(np.count_nonzero(_has_consecutive(m)))
+        stats.sum_total = int(sums.sum())
+        stats.sum_mean = float(np.mean(sums))
+        stats.sum_m2 = float(np.sum((sums - stats.sum_mean) ** 2))
+        stats.sum_min = int(sums.min())
+        stats.sum_max = int(sums.max())
+        stats.last_seen, stats.last_draw, stats.gap_hist = _gap_state(m)
+        stats.latest_draw = m.draw(-1)
+        return stats
+
+    def _copy(self):
+        stats = IncrementalStats.__new__(IncrementalStats)
+        stats.__dict__.update(self.__dict__)
+        for name in ('counts', 'recent_counts', 'range_counts', 'combo_counts', 'combo_first_seen',
+                     'last_seen', 'last_draw'):
+            setattr(stats, name, list(getattr(self, name)))
+        stats.recent = deque(self.recent)
+        stats.gap_hist = [list(hist) for hist in self.gap_hist]
+        return stats
+
+    def _append(self, draw):
+        """새 회차 하나를 반영 (extend()가 만든 복사본에만 호출)"""
+        nums = sorted(draw['numbers'])
+        for n in nums:
+            self.counts[n] += 1
+            self.recent_counts[n] += 1
+            self.range_counts[_RANGE_INDEX[n]] += 1
+            if self.last_seen[n] is not None:
+                gap = self.total - self.last_seen[n] - 1
+                hist = self.gap_hist[n]
+                if gap >= len(hist):
+                    hist.extend([0] * (gap + 1 - len(hist)))
+                hist[gap] += 1
+            self.last_seen[n] = self.total
+            self.last_draw[n] = draw['draw_no']
+        self.recent.append(nums)
+        if len(self.recent) > self.recent_n:
+            for n in self.recent.popleft():
+                self.recent_counts[n] -= 1
+
+        odd = sum(n % 2 for n in nums)
+        if self.combo_first_seen[odd] is None:
+            self.combo_first_seen[odd] = self.total
+        self.combo_counts[odd] += 1
+        self.odd_total += odd
+        if any(b - a == 1 for a, b in zip(nums, nums[1:])):
+            self.consecutive += 1
+
+        s = sum(nums)
+        self.total += 1
+        self.sum_total += s
+        delta = s - self.sum_mean
+        self.sum_mean += delta / self.total
+        self.sum_m2 += delta * (s - self.sum_mean)
+        self.sum_min = s if self.sum_min is None else min(self.sum_min, s)
+        self.sum_max = s if self.sum_max is None else max(self.sum_max, s)
+        self.latest_draw = draw
+
+    def extends(self, draws):
+        """draws가 현재 상태의 이력 뒤에 회차만 추가된 것인지 확인
+
+        마지막으로 반영한 회차가 같은 위치에 그대로 있는지만 본다 (중간 회차가 채워지면 위치가 밀림).
+        """
+        m = as_matrix(draws)
+        if len(m) < self.total:
+            return False
+        return self.total == 0 or m.draw(self.total - 1) == self.latest_draw
+
+    def extend(self, draws):
+        """이미 반영된 이후의 회차를 반영한 새 상태"""
+        m = as_matrix(draws)
+        stats = self._copy()
+        for i in range(self.total, len(m)):
+            stats._append(m.draw(i))
+        return stats
+
+    def summary(self):
+        """get_base_analysis()와 같은 형식의 결과"""
+        total = self.total
+        hot, cold = _hot_cold_from_counts(self.recent_counts)
+        number_total = total * 6
+        return {
+            'total_draws': total,
+            'latest_draw': self.latest_draw,
+            'frequency': {n: self.counts[n] for n in range(1, 46)},
+            'recent_frequency': {n: self.recent_counts[n] for n in range(1, 46)},
+            'hot_numbers': hot,
+            'cold_numbers': cold,
+            'gaps': _gap_rows(total, self.last_seen, self.last_draw, self.gap_hist),
+            'range_analysis': {k: round(v / number_total * 100, 1) for k, v in zip(RANGE_LABELS, self.range_counts)},
+            'odd_even': {
+                'avg_odd': round(np.float64(self.odd_total / total), 2),
+                'avg_even': round(np.float64((total * 6 - self.odd_total) / total), 2),
+                'combos': _odd_even_combos(self.combo_counts, self.combo_first_seen),
+            },
+            'consecutive': {
+                'consecutive_draws': self.consecutive,
+                'total_draws': total,
+                'percentage': round(self.consecutive / total * 100, 1) if total > 0 else 0
+            },
+            'sum_stats': {
+                'avg': round(np.float64(self.sum_total / total), 1),
+                'min': self.sum_min,
+                'max': self.sum_max,
+                'std': round(np.float64(math.sqrt(self.sum_m2 / total)), 1),
+            },
+        }
+
+
+def _build_analysis(draws):
+    """(누적 통계 상태, 분석 결과) - 직전 상태 뒤에 회차만 추가됐으면 새 회차만 반영"""
+    m = as_matrix(draws)
+    previous = _analysis_cache.peek()
+    if previous is not None and previous[0].extends(m):
+        stats = previous[0].extend(m)
+    else:
+        stats = IncrementalStats.from_matrix(m)
+    return stats, stats.summary() if len(m) else get_base_analysis(m)
+
+
+def get_analysis_state():
+    """현재 분석 결과를 만든 누적 통계 상태 (없으면 None, 바뀌지 않는 객체)"""
+    previous = _analysis_cache.peek()
+    return None if previous is None else previous[0]
+
+
+def get_cached_base_analysis(draws, version):
+    """데이터 버전이 같으면 캐시된 통계 분석 결과 반환 (동시에 들어온 계산은 한 번만 수행)
+
+    이전 버전 뒤에 회차만 추가된 경우 누적 상태에 새 회차만 반영한다.
+    """
+    return _analysis_cache.get(version, lambda: _build_analysis(draws))[1]
+
+
+def get_cached_cooccurrence(draws, version, index=None):
+    """데이터 버전이 같으면 캐시된 동시 출현 분석 결과 반환"""
+    return _cooccurrence_cache.get(version, lambda: cooccurrence_analysis(draws, index))
+
+
+def get_prefix_stats(draws, version):
+    """데이터 버전이 같으면 캐시된 누적 합 배열 반환"""
+    return _prefix_cache.get(version, lambda: PrefixStats(draws))
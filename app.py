@@ -1,14 +1,49 @@
-from flask import Flask, render_template, jsonify, request, Response
-from lotto_data import get_draws, fetch_all_draws, get_latest_draw_number, load_cache, get_fetch_status
-from analysis import get_full_analysis, predict_numbers, frequency_analysis, sum_analysis
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, redirect, url_for
+from lotto_data import get_draws, fetch_all_draws, start_refresh_job, get_refresh_job, get_latest_draw_number, get_snapshot, get_fetch_status, get_update_status, add_snapshot_listener, start_background, stop_background, is_leader
+from analysis import KeyedCache, get_cached_base_analysis, get_cached_cooccurrence, TOP_COMBOS_MAX, get_prefix_stats, rolling_frequency, predict_numbers, predict_batches, simulate_tickets, check_tickets, iter_check_results
+from draw_matrix import parse_tickets
 from store_data import fetch_store_data, get_store_data, get_store_fetch_status
-from collections import Counter
+from collections import Counter, OrderedDict, deque
+import numpy as np
 import threading
+import hashlib
+import gzip
 import os
 import json
 
+try:
+    import brotli
+except ImportError:  # 선택 의존성: 없으면 gzip만 제공
+    brotli = None
+
 app = Flask(__name__)
 
+# 시뮬레이션 한 번에 받는 최대 티켓 수
+SIMULATE_MAX_TICKETS = 100
+# 대량 당첨 확인 한 번에 받는 최대 티켓 수
+CHECK_MAX_TICKETS = 100000
+# /api/data 응답 캐시 시간 (이후에는 ETag로 재검증)
+DATA_MAX_AGE = 600
+
+# /api/draws 한 페이지 최대 회차 수
+DRAWS_MAX_PER_PAGE = 100
+# /api/rolling 한 번에 반환하는 최대 구간 수
+ROLLING_MAX_POINTS = 5000
+# /api/predict 한 번에 생성하는 최대 세트 수, 기본 세트 수
+PREDICT_MAX_SETS = 100
+PREDICT_DEFAULT_SETS = 5
+# 미리 생성해 두는 기본 예측 묶음 수 (절반 아래로 줄면 백그라운드에서 다시 채움)
+PREDICT_POOL_SIZE = 1000
+# 회차 상세 페이지 렌더링 결과를 보관할 최대 개수
+DRAW_PAGE_CACHE_SIZE = 1500
+
+SITE_URL = 'https://lottoanalytics.co.kr'
+# 회차별 하위 사이트맵 하나에 담는 회차 수
+SITEMAP_DRAWS_PER_FILE = 500
+_SITEMAP_URLSET_HEAD = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+# style.css 캐시 무효화용 버전 (파일 수정 시각, 캐시된 페이지도 같은 값을 쓰도록 기동 시 한 번 계산)
+STATIC_VERSION = int(os.path.getmtime(os.path.join(app.static_folder, 'css', 'style.css')))
+
 
 @app.after_request
 def add_cache_headers(response):
@@ -17,12 +52,160 @@ def add_cache_headers(response):
         response.cache_control.public = True
     return response
 
+
+@app.context_processor
+def _template_globals():
+    # canonical/og:url 은 요청 경로가 아니라 라우트로 만든 정규 경로 (/draw/012 -> /draw/12)
+    path = url_for(request.endpoint, **request.view_args) if request.endpoint else request.path
+    return {'canonical_path': path, 'static_version': STATIC_VERSION}
+
 # 백그라운드 데이터 수집
 _data_ready = threading.Event()
 
 
 _store_ready = threading.Event()
 
+# 데이터 버전별로 미리 직렬화·압축해 둔 /api/data 응답 본문
+_data_body_cache = KeyedCache()
+
+
+def _build_data_body(snapshot):
+    """/api/data 본문을 한 번 직렬화해 인코딩별로 압축"""
+    analysis = get_cached_base_analysis(snapshot.matrix, snapshot.version)
+    raw = app.json.dumps({'draws': snapshot.draws, 'analysis': analysis}).encode('utf-8')
+    bodies = {'identity': raw, 'gzip': gzip.compress(raw, compresslevel=9)}
+    if brotli is not None:
+        bodies['br'] = brotli.compress(raw, quality=11)
+    return {'etag': hashlib.sha1(raw).hexdigest(), 'bodies': bodies}
+
+
+def _get_data_body(snapshot):
+    return _data_body_cache.get(snapshot.version, lambda: _build_data_body(snapshot))
+
+
+def _data_response(snapshot):
+    """미리 압축된 본문을 ETag/Cache-Control과 함께 반환 (If-None-Match 일치 시 304)"""
+    cache = _get_data_body(snapshot)
+    bodies = cache['bodies']
+    encoding = request.accept_encodings.best_match([e for e in ('br', 'gzip') if e in bodies]) or 'identity'
+    etags = {enc: cache['etag'] if enc == 'identity' else f"{cache['etag']}-{enc}" for enc in bodies}
+
+    if any(request.if_none_match.contains_weak(tag) for tag in etags.values()):
+        response = Response(status=304)
+    else:
+        response = Response(bodies[encoding], mimetype='application/json')
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etags[encoding])
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.public = True
+    response.cache_control.max_age = DATA_MAX_AGE
+    return response
+
+
+class LRUCache:
+    """크기가 제한된 LRU 캐시 (적중/실패 횟수 집계)"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def discard_if(self, predicate):
+        """조건에 맞는 키의 항목 제거"""
+        with self._lock:
+            for key in [k for k in self._items if predicate(k)]:
+                del self._items[key]
+
+    def stats(self):
+        return {'size': len(self._items), 'capacity': self.capacity, 'hits': self.hits, 'misses': self.misses}
+
+
+# (회차 번호, 데이터 버전) -> 렌더링된 회차 상세 페이지 HTML
+_draw_page_cache = LRUCache(DRAW_PAGE_CACHE_SIZE)
+
+# 데이터 버전별 사이트맵 (인덱스 + 하위 사이트맵 조각)
+_sitemap_cache = KeyedCache()
+
+
+_predict_pool_lock = threading.Lock()
+_predict_pool = {'key': None, 'batches': deque(), 'refilling': False}
+
+
+def _refill_predict_pool(snapshot):
+    """현재 데이터셋 기준 기본 예측 묶음을 한 번에 생성해 풀에 채움 (실패해도 다음 요청에서 다시 시도)"""
+    try:
+        batches = predict_batches(snapshot.matrix, PREDICT_POOL_SIZE, PREDICT_DEFAULT_SETS).tolist()
+        with _predict_pool_lock:
+            if _predict_pool['key'] != snapshot.version:
+                _predict_pool['key'] = snapshot.version
+                _predict_pool['batches'] = deque()
+            _predict_pool['batches'].extend(batches)
+    except Exception as e:
+        print(f'예측 풀 생성 오류: {e}')
+    finally:
+        with _predict_pool_lock:
+            _predict_pool['refilling'] = False
+
+
+def _schedule_pool_refill(snapshot):
+    """풀이 다른 데이터셋 것이거나 절반 아래로 줄었으면 백그라운드에서 다시 채움"""
+    with _predict_pool_lock:
+        pool = _predict_pool
+        if pool['refilling'] or (pool['key'] == snapshot.version and len(pool['batches']) >= PREDICT_POOL_SIZE // 2):
+            return
+        pool['refilling'] = True
+    threading.Thread(target=_refill_predict_pool, args=(snapshot,), daemon=True).start()
+
+
+def _take_predictions(snapshot):
+    """풀에서 기본 예측 묶음 하나를 꺼냄 (비어 있으면 바로 생성)"""
+    with _predict_pool_lock:
+        pool = _predict_pool
+        batch = pool['batches'].popleft() if pool['key'] == snapshot.version and pool['batches'] else None
+    _schedule_pool_refill(snapshot)
+    return batch if batch is not None else predict_numbers(snapshot.matrix, PREDICT_DEFAULT_SETS)
+
+
+def _warm_caches(snapshot):
+    get_cached_base_analysis(snapshot.matrix, snapshot.version)
+    get_cached_cooccurrence(snapshot.matrix, snapshot.version, snapshot.number_index)
+    get_prefix_stats(snapshot.matrix, snapshot.version)
+    _get_data_body(snapshot)
+    _get_sitemaps()
+    _schedule_pool_refill(snapshot)
+
+
+def _on_new_snapshot(snapshot):
+    """새 회차가 반영되면 이전 버전 페이지를 버리고 분석 결과를 요청 경로 밖에서 미리 계산"""
+    _draw_page_cache.discard_if(lambda key: key[1] != snapshot.version)
+    if snapshot.draws:
+        # 팔로워 워커는 리더가 쓴 데이터를 읽는 순간 준비 완료
+        if not is_leader():
+            _data_ready.set()
+        threading.Thread(target=_warm_caches, args=(snapshot,), daemon=True).start()
+
+
+add_snapshot_listener(_on_new_snapshot)
+
 
 def _bg_fetch():
     print('데이터 수집 시작...')
@@ -37,6 +220,32 @@ def _bg_fetch():
     _store_ready.set()
 
 
+def start_background_tasks():
+    """백그라운드 수집 시작 (워커 프로세스마다 한 번, 수집은 리더 워커만)
+
+    gunicorn은 gunicorn.conf.py 의 post_worker_init 에서, 직접 실행은 __main__ 에서 호출한다.
+    """
+    start_background(on_leader=_bg_fetch)
+    if not is_leader() and get_snapshot().draws:
+        _data_ready.set()
+
+
+# gunicorn/직접 실행이 아닌 WSGI 서버에서 첫 요청 때 백그라운드 수집을 시작할지 (명시적으로 켤 때만)
+START_BACKGROUND_ON_REQUEST = os.environ.get('START_BACKGROUND_ON_REQUEST') == '1'
+
+
+@app.before_request
+def _ensure_background_tasks():
+    # 테스트 클라이언트 요청만으로 리더 잠금을 잡거나 수집 스레드를 띄우지 않도록 기본은 꺼 둠
+    if START_BACKGROUND_ON_REQUEST:
+        start_background_tasks()
+
+
+def _current_draws():
+    """준비 전에는 저장소에 있는 데이터만, 준비 후에는 필요 시 수집까지 해서 반환"""
+    return get_draws() if _data_ready.is_set() else get_snapshot().draws
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -46,73 +255,399 @@ def index():
 def api_status():
     """데이터 수집 상태 반환"""
     status = get_fetch_status()
-    cached = load_cache()
+    snapshot = get_snapshot()
     return jsonify({
         'ready': _data_ready.is_set(),
-        'cached_count': len(cached),
+        'cached_count': len(snapshot.draws),
+        'version': snapshot.version,
+        'draw_page_cache': _draw_page_cache.stats(),
         'fetching': status['running'],
         'progress': status['progress'],
         'total': status['total'],
+        'update': get_update_status(),
     })
 
 
 @app.route('/api/data')
 def api_data():
-    """전체 당첨 데이터 + 분석 결과 반환"""
+    """전체 당첨 데이터 + 분석 결과 반환 (예측 번호는 /api/predict)
+
+    - as_of: 해당 회차까지의 데이터와 그 시점 기준 분석 결과만 반환
+    """
+    as_of = request.args.get('as_of', type=int)
+    if as_of is not None:
+        return _data_as_of(get_snapshot(), as_of)
     if not _data_ready.is_set():
         # 데이터가 아직 준비되지 않은 경우 캐시된 것이라도 반환
-        cached = load_cache()
-        if len(cached) >= 10:
-            analysis = get_full_analysis(cached)
-            return jsonify({'draws': cached, 'analysis': analysis})
+        snapshot = get_snapshot()
+        if len(snapshot.draws) >= 10:
+            return _data_response(snapshot)
         return jsonify({'error': 'loading', 'message': '데이터를 수집하는 중입니다...'}), 202
 
-    draws = get_draws()
-    analysis = get_full_analysis(draws)
-    return jsonify({'draws': draws, 'analysis': analysis})
+    get_draws()
+    return _data_response(get_snapshot())
 
 
-@app.route('/api/draws')
-def api_draws():
-    """당첨번호 목록 (페이지네이션)"""
-    draws = load_cache() if not _data_ready.is_set() else get_draws()
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
-    search = request.args.get('search', '', type=str)
+def _data_as_of(snapshot, as_of):
+    """as_of 회차까지의 데이터와 누적 배열로 계산한 그 시점 분석 결과"""
+    if not snapshot.draws:
+        return jsonify({'error': 'loading', 'message': '데이터를 수집하는 중입니다...'}), 202
+    prefix = get_prefix_stats(snapshot.matrix, snapshot.version)
+    i = prefix.index_of(as_of)
+    if i == 0:
+        return jsonify({'error': f'{as_of}회차 이전 데이터가 없습니다.'}), 404
+    return jsonify({'draws': snapshot.draws[:i], 'analysis': prefix.summary(i), 'as_of': as_of})
+
+
+@app.route('/api/draws/since/<int:draw_no>')
+def api_draws_since(draw_no):
+    """draw_no 이후 새 회차만 반환
+
+    새 회차가 있거나 클라이언트가 가진 데이터 키(key, /api/data 의 ETag)가 현재와 다르면
+    갱신된 분석 결과도 함께 보낸다 (회차는 그대로여도 분석 항목이 바뀔 수 있음).
+    """
+    snapshot = get_snapshot()
+    if not snapshot.draws:
+        return jsonify({'error': 'loading', 'message': '데이터를 수집하는 중입니다...'}), 202
+    start = int(np.searchsorted(snapshot.matrix.draw_no, draw_no, side='right'))
+    new_draws = snapshot.draws[start:]
+    key = _get_data_body(snapshot)['etag']
+    stale = new_draws or request.args.get('key') != key
+    return jsonify({
+        'draws': new_draws,
+        'analysis': get_cached_base_analysis(snapshot.matrix, snapshot.version) if stale else None,
+        'key': key,
+        'latest': snapshot.latest_no,
+        'total_draws': len(snapshot.draws),
+    })
 
-    sorted_draws = sorted(draws, key=lambda x: x['draw_no'], reverse=True)
+
+def _parse_numbers_arg(text):
+    """'7,33' 형식의 번호 목록 (1~45, 중복 제거)"""
+    numbers = sorted({int(x) for x in text.split(',') if x.strip()})
+    if any(n < 1 or n > 45 for n in numbers):
+        raise ValueError('번호는 1~45 사이여야 합니다.')
+    return numbers
+
+
+def _filter_positions(snapshot, search='', date_from=None, date_to=None, numbers=None):
+    """조건에 맞는 회차 위치 (오름차순 range 또는 배열, 전체 정렬·순회 없이 인덱스로 계산)"""
+    m = snapshot.matrix
+    lo, hi = 0, len(m)
+    # 날짜는 회차 순서와 같은 방향으로 증가하므로 이분 탐색으로 구간 계산
+    if date_from is not None:
+        lo = int(np.searchsorted(m.dates, date_from, side='left'))
+    if date_to is not None:
+        hi = int(np.searchsorted(m.dates, date_to, side='right'))
+    hi = max(lo, hi)
+    positions = range(lo, hi)
 
     if search:
-        sorted_draws = [d for d in sorted_draws if str(d['draw_no']).startswith(search)]
+        prefixed = snapshot.prefix_index.get(search, np.empty(0, dtype=np.int64))
+        positions = prefixed[np.searchsorted(prefixed, lo):np.searchsorted(prefixed, hi)]
+    if numbers:
+        index = snapshot.number_index
+        matched = index.positions(index.match(numbers))
+        if isinstance(positions, range):
+            positions = matched[np.searchsorted(matched, lo):np.searchsorted(matched, hi)]
+        else:
+            positions = np.intersect1d(positions, matched, assume_unique=True)
+    return positions
+
 
-    total = len(sorted_draws)
-    start = (page - 1) * per_page
-    end = start + per_page
-    page_draws = sorted_draws[start:end]
+@app.route('/api/draws')
+def api_draws():
+    """당첨번호 목록 (최신순, page 또는 cursor 기반 페이지네이션)
+
+    - search: 회차 번호 접두사, from_date/to_date: 추첨일 범위, numbers: 모두 포함해야 할 번호
+    - cursor: 이전 페이지 마지막 회차 번호 (이보다 작은 회차부터 반환)
+    """
+    if not _current_draws():
+        return jsonify({'draws': [], 'total': 0, 'page': 1, 'per_page': 0, 'total_pages': 1, 'next_cursor': None})
+    snapshot = get_snapshot()
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), DRAWS_MAX_PER_PAGE)
+    cursor = request.args.get('cursor', type=int)
+    try:
+        date_from = np.datetime64(request.args['from_date'], 'D') if request.args.get('from_date') else None
+        date_to = np.datetime64(request.args['to_date'], 'D') if request.args.get('to_date') else None
+        numbers = _parse_numbers_arg(request.args.get('numbers', '', type=str))
+    except ValueError:
+        return jsonify({'error': '검색 조건이 올바르지 않습니다.'}), 400
+
+    positions = _filter_positions(snapshot, request.args.get('search', '', type=str), date_from, date_to, numbers)
+    total = len(positions)
+
+    # 최신순이므로 뒤에서부터 잘라냄
+    if cursor is not None:
+        if isinstance(positions, range):
+            cut = int(np.searchsorted(snapshot.matrix.draw_no, cursor, side='left'))
+            end = min(max(cut - positions.start, 0), total)
+        else:
+            end = int(np.searchsorted(snapshot.matrix.draw_no[positions], cursor, side='left'))
+    else:
+        end = max(total - (page - 1) * per_page, 0)
+    start = max(end - per_page, 0)
+    page_positions = positions[start:end]
+    page_draws = [snapshot.draws[i] for i in reversed(page_positions)]
 
     return jsonify({
         'draws': page_draws,
         'total': total,
         'page': page,
         'per_page': per_page,
-        'total_pages': max(1, (total + per_page - 1) // per_page)
+        'total_pages': max(1, (total + per_page - 1) // per_page),
+        'next_cursor': page_draws[-1]['draw_no'] if page_draws and start > 0 else None,
     })
 
 
+@app.route('/api/query')
+def api_query():
+    """번호 포함 조회 (예: numbers=7,33 -> 두 번호가 함께 나온 회차)
+
+    - bonus: 보너스 번호 조건 (선택), limit: 반환할 최근 회차 수
+    """
+    if not _current_draws():
+        return jsonify({'error': '데이터가 없습니다.'}), 500
+    try:
+        numbers = _parse_numbers_arg(request.args.get('numbers', '', type=str))
+        bonus = request.args.get('bonus', type=int)
+        if bonus is not None and not 1 <= bonus <= 45:
+            raise ValueError
+    except ValueError:
+        return jsonify({'error': '번호는 1~45 사이여야 합니다.'}), 400
+    if not numbers and bonus is None:
+        return jsonify({'error': '조회할 번호를 입력해주세요.'}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 0), DRAWS_MAX_PER_PAGE)
+
+    snapshot = get_snapshot()
+    index = snapshot.number_index
+    words = index.match(numbers, bonus)
+    last = index.last(words)
+    recent = index.positions(words)[::-1][:limit] if limit else []
+    return jsonify({
+        'numbers': numbers,
+        'bonus': bonus,
+        'count': index.count(words),
+        'total_draws': index.size,
+        'last': None if last is None else snapshot.draws[last],
+        # 캐시에 빠진 회차가 있어도 회차 번호 차이로 계산
+        'draws_since_last': None if last is None else snapshot.latest_no - int(snapshot.matrix.draw_no[last]),
+        'draws': [snapshot.draws[i] for i in recent],
+    })
+
+
+@app.route('/api/gaps')
+def api_gaps():
+    """번호별 미출현 간격 (마지막 출현 이후 회차 수, 과거 간격 분포)"""
+    if not _current_draws():
+        return jsonify({'error': '데이터가 없습니다.'}), 500
+    snapshot = get_snapshot()
+    analysis = get_cached_base_analysis(snapshot.matrix, snapshot.version)
+    gaps = analysis['gaps']
+    return jsonify({
+        'total_draws': analysis['total_draws'],
+        'latest_draw': analysis['latest_draw'],
+        'gaps': gaps,
+        # 마지막 출현 이후 가장 오래된 번호 순
+        'overdue': sorted(gaps, key=lambda row: row['current_gap'], reverse=True)[:9],
+    })
+
+
+@app.route('/api/rolling')
+def api_rolling():
+    """번호별 출현 빈도 추이 (window 회차 구간을 stride 간격으로 이동)"""
+    if not _current_draws():
+        return jsonify({'error': '데이터가 없습니다.'}), 500
+    snapshot = get_snapshot()
+    total = len(snapshot.matrix)
+    window = request.args.get('window', 50, type=int)
+    stride = request.args.get('stride', 1, type=int)
+    if not 1 <= window <= total or stride < 1:
+        return jsonify({'error': f'window는 1~{total}, stride는 1 이상이어야 합니다.'}), 400
+    if (total - window) // stride + 1 > ROLLING_MAX_POINTS:
+        return jsonify({'error': f'구간이 너무 많습니다. stride를 늘려주세요. (최대 {ROLLING_MAX_POINTS}개)'}), 400
+    prefix = get_prefix_stats(snapshot.matrix, snapshot.version)
+    return jsonify(rolling_frequency(snapshot.matrix, window, stride, prefix))
+
+
+@app.route('/api/cooccurrence')
+def api_cooccurrence():
+    """번호 쌍 동시 출현 행렬 (히트맵용)과 자주 함께 나온 쌍/3개 조합
+
+    - top: 반환할 상위 조합 수 (최대 100)
+    """
+    if not _current_draws():
+        return jsonify({'error': '데이터가 없습니다.'}), 500
+    snapshot = get_snapshot()
+    top = min(max(request.args.get('top', 20, type=int), 0), TOP_COMBOS_MAX)
+    result = dict(get_cached_cooccurrence(snapshot.matrix, snapshot.version, snapshot.number_index))
+    result['top_pairs'] = result['top_pairs'][:top]
+    result['top_triples'] = result['top_triples'][:top]
+    return jsonify(result)
+
+
 @app.route('/api/predict')
 def api_predict():
-    """새로운 예측 번호 생성"""
-    draws = load_cache() if not _data_ready.is_set() else get_draws()
+    """새로운 예측 번호 생성
+
+    - num_sets: 세트 수 (최대 100), seed: 같은 값이면 같은 결과
+    """
+    draws = _current_draws()
     if not draws:
         return jsonify({'error': '데이터가 없습니다.'}), 500
-    predictions = predict_numbers(draws)
+    num_sets = request.args.get('num_sets', PREDICT_DEFAULT_SETS, type=int)
+    seed = request.args.get('seed', type=int)
+    if not 1 <= num_sets <= PREDICT_MAX_SETS:
+        return jsonify({'error': f'세트 수는 1~{PREDICT_MAX_SETS} 사이여야 합니다.'}), 400
+    if seed is not None and seed < 0:
+        return jsonify({'error': 'seed는 0 이상이어야 합니다.'}), 400
+
+    snapshot = get_snapshot()
+    if seed is None and num_sets == PREDICT_DEFAULT_SETS:
+        predictions = _take_predictions(snapshot)
+    else:
+        predictions = predict_numbers(snapshot.matrix, num_sets, seed)
     next_draw = get_latest_draw_number() + 1
     return jsonify({
         'next_draw': next_draw,
-        'predictions': predictions
+        'predictions': predictions,
+        'seed': seed,
     })
 
 
+def _int_param(value, message):
+    """요청의 정수 값 (없으면 None)
+
+    티켓 번호와 같이 정수 또는 정수 문자열만 받고, 6.9나 true 같은 값은 잘라내지 않고 ValueError(message)로 거부한다.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(message)
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(message)
+
+
+def _draw_range_args(source):
+    """요청의 from/to 회차 범위 (없으면 None)"""
+    message = 'from/to는 회차 번호여야 합니다.'
+    first, last = _int_param(source.get('from'), message), _int_param(source.get('to'), message)
+    if first is not None and last is not None and first > last:
+        raise ValueError('from은 to보다 클 수 없습니다.')
+    return first, last
+
+
+@app.route('/api/simulate', methods=['GET', 'POST'])
+def api_simulate():
+    """티켓 번호로 역대 회차(또는 지정 범위) 당첨 시뮬레이션"""
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        if not isinstance(body, dict):
+            return jsonify({'error': '요청 본문은 JSON 객체여야 합니다.'}), 400
+        tickets = body.get('tickets') or [body.get('numbers')]
+        source = body
+    else:
+        tickets = [request.args.get('numbers', '', type=str).split(',')]
+        source = request.args
+    try:
+        tickets = parse_tickets(tickets)
+        first, last = _draw_range_args(source)
+        limit = _int_param(source.get('limit'), 'limit은 정수여야 합니다.')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if len(tickets) > SIMULATE_MAX_TICKETS:
+        return jsonify({'error': f'티켓은 최대 {SIMULATE_MAX_TICKETS}개까지 가능합니다.'}), 400
+
+    snapshot = get_snapshot()
+    if not snapshot.draws:
+        return jsonify({'error': '데이터가 없습니다.'}), 500
+    matrix = snapshot.matrix.between(first, last)
+    if len(matrix) == 0:
+        return jsonify({'error': '해당 회차 데이터가 없습니다.'}), 404
+    limit = 100 if limit is None else min(max(limit, 0), 1000)
+    return jsonify(simulate_tickets(matrix, tickets, limit=limit))
+
+
+def _read_ticket_batch():
+    """JSON({'tickets': [...]}) 또는 NDJSON(한 줄에 티켓 하나) 본문에서 티켓 목록과 옵션 읽기"""
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        tickets = []
+        for line in request.get_data(as_text=True).splitlines():
+            line = line.strip()
+            if line:
+                try:
+                    item = json.loads(line)
+                except json.JSONDecodeError:
+                    raise ValueError('NDJSON 본문은 한 줄에 티켓 JSON 하나씩이어야 합니다.')
+                tickets.append(item['numbers'] if isinstance(item, dict) else item)
+        return tickets, {}
+    body = request.get_json(silent=True) or {}
+    if not isinstance(body, dict):
+        raise ValueError('요청 본문은 JSON 객체여야 합니다.')
+    return body.get('tickets'), body
+
+
+def _stream_check_results(matrix, tickets):
+    """티켓별 결과를 한 줄씩, 마지막 줄에 전체 집계를 NDJSON으로 생성"""
+    rank_counts = [0] * 6
+    winnings = 0.0
+    for chunk in iter_check_results(matrix, tickets):
+        wins_by_ticket = {}
+        for t, d, r in chunk['wins']:
+            wins_by_ticket.setdefault(t, []).append([d, r])
+        lines = []
+        for offset, best in enumerate(chunk['best_rank'].tolist()):
+            t = chunk['start'] + offset
+            lines.append(json.dumps({'ticket': t, 'best_rank': best, 'wins': wins_by_ticket.get(t, [])}))
+        yield '\n'.join(lines) + '\n'
+        for r in range(6):
+            rank_counts[r] += int(chunk['rank_counts'][r])
+        winnings += chunk['winnings']
+    yield json.dumps({'summary': {
+        'draws': matrix.draw_no.tolist(),
+        'ticket_count': len(tickets),
+        'rank_counts': {str(r): rank_counts[r] for r in range(1, 6)},
+        'total_winnings': winnings,
+    }}) + '\n'
+
+
+@app.route('/api/check', methods=['POST'])
+def api_check():
+    """대량 티켓 당첨 확인 (회차 하나 또는 회차 범위, 기본은 최신 회차)"""
+    try:
+        tickets, body = _read_ticket_batch()
+        tickets = parse_tickets(tickets)
+        params = dict(request.args.to_dict(), **body)
+        draw_no = _int_param(params.get('draw_no'), 'draw_no는 회차 번호여야 합니다.')
+        if draw_no is not None:
+            first = last = draw_no
+        else:
+            first, last = _draw_range_args(params)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except (KeyError, TypeError):
+        return jsonify({'error': '티켓 형식이 올바르지 않습니다.'}), 400
+    if len(tickets) > CHECK_MAX_TICKETS:
+        return jsonify({'error': f'티켓은 최대 {CHECK_MAX_TICKETS}개까지 가능합니다.'}), 400
+
+    snapshot = get_snapshot()
+    if not snapshot.draws:
+        return jsonify({'error': '데이터가 없습니다.'}), 500
+    if first is None and last is None:
+        matrix = snapshot.matrix[-1:]
+    else:
+        matrix = snapshot.matrix.between(first, last)
+    if len(matrix) == 0:
+        return jsonify({'error': '해당 회차 데이터가 없습니다.'}), 404
+
+    if request.args.get('stream') == '1' or 'application/x-ndjson' in request.headers.get('Accept', ''):
+        return Response(stream_with_context(_stream_check_results(matrix, tickets)), mimetype='application/x-ndjson')
+    return jsonify(check_tickets(matrix, tickets))
+
+
 @app.route('/api/stores')
 def api_stores():
     """1등 배출 판매점 데이터 반환"""
@@ -128,15 +663,30 @@ def api_stores():
 @app.route('/draw/<int:draw_no>')
 def draw_detail(draw_no):
     """회차별 상세 분석 페이지"""
-    draws = load_cache() if not _data_ready.is_set() else get_draws()
-    if not draws:
+    # /draw/012 처럼 정규 경로가 아니면 캐시를 거치기 전에 영구 이동
+    canonical = url_for('draw_detail', draw_no=draw_no)
+    if request.path != canonical:
+        return redirect(canonical, 301)
+    if not _current_draws():
         return render_template('page.html', title='데이터 로딩 중', description='', content='<p>데이터를 수집하는 중입니다. 잠시 후 다시 시도해주세요.</p>')
 
-    draw_map = {d['draw_no']: d for d in draws}
-    draw = draw_map.get(draw_no)
+    snapshot = get_snapshot()
+    draw = snapshot.get_draw(draw_no)
     if not draw:
         return render_template('page.html', title='회차를 찾을 수 없습니다', description='', content=f'<p>제 {draw_no}회 데이터가 없습니다.</p>'), 404
 
+    key = (draw_no, snapshot.version)
+    html = _draw_page_cache.get(key)
+    if html is None:
+        html = _render_draw_page(snapshot, draw)
+        _draw_page_cache.put(key, html)
+    return html
+
+
+def _render_draw_page(snapshot, draw):
+    """회차 상세 페이지 HTML 생성 (출현 횟수와 평균 합계는 해당 회차까지의 데이터 기준)"""
+    prefix = get_prefix_stats(snapshot.matrix, snapshot.version)
+    upto = prefix.index_of(draw['draw_no'])
     nums = draw['numbers']
     number_sum = sum(nums)
     odd_count = sum(1 for n in nums if n % 2 == 1)
@@ -164,14 +714,13 @@ def draw_detail(draw_no):
     last_digit_counter = Counter(n % 10 for n in nums)
     last_digits = ', '.join(f'{d}끝: {c}개' for d, c in sorted(last_digit_counter.items()))
 
-    # 역대 빈도
-    freq = frequency_analysis(draws)
-    number_freq = {n: freq.get(n, 0) for n in sorted(nums + [draw['bonus']])}
+    # 이 회차까지의 빈도
+    freq = prefix.counts[upto]
+    number_freq = {n: int(freq[n]) for n in sorted(nums + [draw['bonus']])}
     max_freq = max(number_freq.values()) if number_freq else 1
 
-    # 합계 평균
-    s_stats = sum_analysis(draws)
-    avg_sum = s_stats['avg']
+    # 이 회차까지의 합계 평균
+    avg_sum = round(np.float64(prefix.sum_total[upto] / upto), 1)
     abs_diff = abs(number_sum - avg_sum)
 
     # 당첨금 표시
@@ -192,8 +741,7 @@ def draw_detail(draw_no):
     else:
         per_person_prize = '정보 없음'
 
-    latest_no = draws[-1]['draw_no']
-    next_draw = draw_no < latest_no
+    next_draw = draw['draw_no'] < snapshot.latest_no
 
     return render_template('draw.html',
         draw=draw,
@@ -419,33 +967,71 @@ def tax_calculator():
     return render_template('tax_calculator.html')
 
 
+def _sitemap_url(loc, changefreq, priority, lastmod=None):
+    lastmod_tag = f'\n    <lastmod>{lastmod}</lastmod>' if lastmod else ''
+    return (f'  <url>\n    <loc>{SITE_URL}{loc}</loc>{lastmod_tag}\n'
+            f'    <changefreq>{changefreq}</changefreq>\n    <priority>{priority}</priority>\n  </url>\n')
+
+
+def _build_sitemaps(snapshot):
+    """사이트맵 인덱스와 하위 사이트맵을 조각 문자열 목록으로 생성"""
+    draws = snapshot.draws
+    latest_no = snapshot.latest_no
+    latest_date = draws[-1]['date'] if draws else None
+
+    # 메인/콘텐츠/법적 페이지
+    pages = [_sitemap_url('/', 'weekly', '1.0', latest_date),
+             _sitemap_url('/probability', 'monthly', '0.7'),
+             _sitemap_url('/tax-calculator', 'monthly', '0.7')]
+    for page in ['faq', 'privacy', 'terms', 'about', 'contact']:
+        pages.append(_sitemap_url(f'/{page}', 'monthly', '0.3'))
+    files = {'pages': [_SITEMAP_URLSET_HEAD] + pages + ['</urlset>']}
+    lastmods = {'pages': latest_date}
+
+    # 회차별 페이지 (회차 번호 구간별로 나눔)
+    for d in draws:
+        name = f"draws-{(d['draw_no'] - 1) // SITEMAP_DRAWS_PER_FILE + 1}"
+        if name not in files:
+            files[name] = [_SITEMAP_URLSET_HEAD]
+        files[name].append(_sitemap_url(f"/draw/{d['draw_no']}", 'never' if d['draw_no'] < latest_no else 'weekly',
+                                        '0.6', d['date'] or None))
+        lastmods[name] = d['date'] or lastmods.get(name)
+    for name, parts in files.items():
+        if name != 'pages':
+            parts.append('</urlset>')
+
+    index = ['<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n']
+    for name in files:
+        lastmod = f'\n    <lastmod>{lastmods[name]}</lastmod>' if lastmods.get(name) else ''
+        index.append(f'  <sitemap>\n    <loc>{SITE_URL}/sitemap-{name}.xml</loc>{lastmod}\n  </sitemap>\n')
+    index.append('</sitemapindex>')
+    files['index'] = index
+    return files
+
+
+def _get_sitemaps():
+    """데이터 버전별로 한 번만 생성한 사이트맵 조각"""
+    snapshot = get_snapshot()
+    return _sitemap_cache.get(snapshot.version, lambda: _build_sitemaps(snapshot))
+
+
+def _sitemap_response(parts):
+    return Response((part for part in parts), mimetype='application/xml')
+
+
 @app.route('/sitemap.xml')
 def sitemap():
-    """SEO용 사이트맵"""
-    draws = load_cache() if not _data_ready.is_set() else get_draws()
-    latest_no = draws[-1]['draw_no'] if draws else 1
-
-    urls = []
-    # 메인 페이지
-    urls.append({'loc': 'https://lottoanalytics.co.kr/', 'priority': '1.0', 'changefreq': 'weekly'})
-    # 법적 페이지
-    # 콘텐츠 페이지
-    urls.append({'loc': 'https://lottoanalytics.co.kr/probability', 'priority': '0.7', 'changefreq': 'monthly'})
-    urls.append({'loc': 'https://lottoanalytics.co.kr/tax-calculator', 'priority': '0.7', 'changefreq': 'monthly'})
-    # 법적 페이지
-    for page in ['faq', 'privacy', 'terms', 'about', 'contact']:
-        urls.append({'loc': f'https://lottoanalytics.co.kr/{page}', 'priority': '0.3', 'changefreq': 'monthly'})
-    # 회차별 페이지 (전체)
-    for no in range(latest_no, 0, -1):
-        urls.append({'loc': f'https://lottoanalytics.co.kr/draw/{no}', 'priority': '0.6', 'changefreq': 'never' if no < latest_no else 'weekly'})
+    """SEO용 사이트맵 인덱스"""
+    return _sitemap_response(_get_sitemaps()['index'])
 
-    xml = '<?xml version="1.0" encoding="UTF-8"?>\n'
-    xml += '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-    for u in urls:
-        xml += f'  <url>\n    <loc>{u["loc"]}</loc>\n    <changefreq>{u["changefreq"]}</changefreq>\n    <priority>{u["priority"]}</priority>\n  </url>\n'
-    xml += '</urlset>'
 
-    return Response(xml, mimetype='application/xml')
+@app.route('/sitemap-<name>.xml')
+def sitemap_child(name):
+    """페이지/회차 구간별 하위 사이트맵"""
+    parts = _get_sitemaps().get(name)
+    if name == 'index' or parts is None:
+        return Response('Not Found', status=404, mimetype='text/plain')
+    return _sitemap_response(parts)
 
 
 @app.route('/ads.txt')
@@ -464,22 +1050,33 @@ Sitemap: https://lottoanalytics.co.kr/sitemap.xml
     return Response(txt, mimetype='text/plain')
 
 
-@app.route('/api/refresh')
+@app.route('/api/refresh', methods=['GET', 'POST'])
 def api_refresh():
-    """데이터 새로고침"""
-    draws = fetch_all_draws()
-    _data_ready.set()
-    return jsonify({'total': len(draws), 'latest': draws[-1]['draw_no'] if draws else 0})
+    """데이터 새로고침 작업 시작 (이미 진행 중이면 그 작업), 진행 상황은 /api/refresh/<job_id>"""
+    job = start_refresh_job()
+    job.future.add_done_callback(lambda _: _data_ready.set())
+    resp = jsonify(job.to_dict())
+    resp.headers['Location'] = f'/api/refresh/{job.id}'
+    return resp, 202
+
 
+@app.route('/api/refresh/<job_id>')
+def api_refresh_job(job_id):
+    """새로고침 작업 상태 (running/done/failed)"""
+    job = get_refresh_job(job_id)
+    if job is None:
+        return jsonify({'error': '작업을 찾을 수 없습니다.'}), 404
+    return jsonify(job.to_dict())
 
-# 앱 시작 시 백그라운드 데이터 수집
-t = threading.Thread(target=_bg_fetch, daemon=True)
-t.start()
 
 if __name__ == '__main__':
     print('로또 분석 웹앱을 시작합니다...')
     port = int(os.environ.get('PORT', 5000))
     print(f'http://localhost:{port} 에서 접속하세요.')
     print('데이터를 백그라운드에서 수집합니다... (최초 실행 시 1~2분 소요)')
+    start_background_tasks()
 
-    app.run(debug=False, host='0.0.0.0', port=port)
+    try:
+        app.run(debug=False, host='0.0.0.0', port=port)
+    finally:
+        stop_background()
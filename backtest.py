@@ -0,0 +1,193 @@
+"""예측 전략 워크포워드 백테스트
+
+각 회차마다 그 이전 회차 데이터만으로 티켓을 만들어 실제 결과와 비교하고,
+여러 seed 결과의 적중률/수익률 분포를 집계한다.
+
+    python backtest.py --seeds 1000 --sets 5 --workers 8
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import lotto_data
+from analysis import PrefixStats, TICKET_PRICE, prediction_weights, select_sets, prize_table
+from draw_matrix import DrawMatrix, NUMBER_MAX, numbers_to_masks, popcount, prize_ranks
+
+# 평가를 시작하기 전에 필요한 최소 이력 회차 수
+MIN_HISTORY = 50
+
+
+def weighted_strategy(prefix, ends, num_sets, rng):
+    """predict_numbers()와 같은 가중치 전략 (회차마다 그 이전 데이터 기준)"""
+    total_freq = prefix.counts[ends, 1:]
+    recent_freq = total_freq - prefix.counts[np.maximum(ends - 50, 0), 1:]
+    weights = prediction_weights(total_freq, recent_freq, rng.random((len(ends), 45)))
+    return select_sets(np.repeat(weights, num_sets, axis=0), rng)
+
+
+def uniform_strategy(prefix, ends, num_sets, rng):
+    """1~45 중 6개를 균등하게 무작위 선택"""
+    keys = rng.random((len(ends) * num_sets, NUMBER_MAX))
+    return np.sort(np.argpartition(keys, 6, axis=1)[:, :6] + 1, axis=1)
+
+
+# 전략 이름 -> 함수 (prefix, 평가 회차 위치, 회차당 세트 수, rng) -> (회차 수 * 세트 수, 6) 티켓
+STRATEGIES = {
+    'weighted': weighted_strategy,
+    'uniform': uniform_strategy,
+}
+
+# 작업 프로세스마다 한 번만 만드는 상태
+_worker = {}
+
+
+def _init_worker(m):
+    _worker['matrix'] = m
+    _worker['prefix'] = PrefixStats(m)
+    _worker['prize_table'] = prize_table(m)
+
+
+def run_seed(strategy, seed, start=MIN_HISTORY, num_sets=5):
+    """seed 하나로 start 위치 회차부터 끝까지 워크포워드 평가"""
+    m = _worker['matrix']
+    ends = np.arange(start, len(m))
+    rng = np.random.default_rng(seed)
+    tickets = STRATEGIES[strategy](_worker['prefix'], ends, num_sets, rng)
+
+    # 티켓 k는 ends[k // num_sets] 위치 회차에 구매
+    targets = np.repeat(ends, num_sets)
+    t_masks = numbers_to_masks(tickets)
+    hits = popcount(t_masks & m.masks[targets])
+    bonus_hit = ((t_masks >> m.bonus[targets].astype(np.uint64)) & np.uint64(1)).astype(bool)
+    ranks = prize_ranks(hits, bonus_hit)
+    winnings = float(_worker['prize_table'][ranks, targets].sum())
+    spent = len(tickets) * TICKET_PRICE
+    return {
+        'seed': seed,
+        'tickets': len(tickets),
+        'hit_counts': np.bincount(hits, minlength=7).tolist(),
+        'rank_counts': np.bincount(ranks, minlength=6).tolist(),
+        'spent': spent,
+        'winnings': winnings,
+        'roi': winnings / spent * 100 if spent else 0.0,
+    }
+
+
+def _run_chunk(strategy, seeds, start, num_sets):
+    return [run_seed(strategy, seed, start, num_sets) for seed in seeds]
+
+
+def summarize(results):
+    """seed별 결과를 적중률/수익률 분포로 집계"""
+    roi = np.array([r['roi'] for r in results])
+    tickets = sum(r['tickets'] for r in results)
+    hit_counts = np.sum([r['hit_counts'] for r in results], axis=0)
+    rank_counts = np.sum([r['rank_counts'] for r in results], axis=0)
+    # seed별 당첨(5등 이상) 티켓 비율
+    win_rate = np.array([sum(r['rank_counts'][1:]) / r['tickets'] * 100 for r in results])
+    return {
+        'seeds': len(results),
+        'tickets': tickets,
+        'hit_distribution': {str(k): round(int(c) / tickets * 100, 4) for k, c in enumerate(hit_counts)},
+        'rank_counts': {str(r): int(rank_counts[r]) for r in range(1, 6)},
+        'win_rate': {'mean': round(float(win_rate.mean()), 3), 'std': round(float(win_rate.std()), 3)},
+        'roi': {
+            'mean': round(float(roi.mean()), 2),
+            'std': round(float(roi.std()), 2),
+            'min': round(float(roi.min()), 2),
+            'p5': round(float(np.percentile(roi, 5)), 2),
+            'p50': round(float(np.percentile(roi, 50)), 2),
+            'p95': round(float(np.percentile(roi, 95)), 2),
+            'max': round(float(roi.max()), 2),
+        },
+    }
+
+
+def backtest(draws, strategies=('weighted', 'uniform'), seeds=range(100), num_sets=5,
+             start=MIN_HISTORY, workers=None):
+    """전략별 여러 seed 백테스트를 프로세스 풀에 나눠 실행하고 집계"""
+    m = draws if isinstance(draws, DrawMatrix) else DrawMatrix.from_draws(draws)
+    if not MIN_HISTORY <= start < len(m):
+        raise ValueError(f'start는 {MIN_HISTORY}~{len(m) - 1} 사이여야 합니다.')
+    seeds = list(seeds)
+    workers = workers or os.cpu_count() or 1
+    chunk = max(1, -(-len(seeds) // (workers * 4)))
+    chunks = [seeds[i:i + chunk] for i in range(0, len(seeds), chunk)]
+
+    results = {}
+    if workers == 1:
+        _init_worker(m)
+        for name in strategies:
+            results[name] = _run_chunk(name, seeds, start, num_sets)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(m,)) as pool:
+            futures = {name: [pool.submit(_run_chunk, name, c, start, num_sets) for c in chunks]
+                       for name in strategies}
+            for name, parts in futures.items():
+                results[name] = [r for f in parts for r in f.result()]
+
+    return {
+        'first_draw': int(m.draw_no[start]),
+        'last_draw': int(m.draw_no[-1]),
+        'draws': len(m) - start,
+        'sets_per_draw': num_sets,
+        'strategies': {name: summarize(res) for name, res in results.items()},
+    }
+
+
+def load_matrix(path=None):
+    """회차 JSON 파일을 읽음 (지정하지 않으면 서버와 같은 캐시 파일과 저널)"""
+    if path is None:
+        return lotto_data.load_cache_matrix()
+    with open(path, 'r', encoding='utf-8') as f:
+        return DrawMatrix.from_draws(json.load(f))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='예측 전략 워크포워드 백테스트')
+    parser.add_argument('--data', help=f'회차 JSON 파일 (기본: 서버 캐시 {lotto_data.DATA_FILE})')
+    parser.add_argument('--strategy', action='append', choices=sorted(STRATEGIES),
+                        help='평가할 전략 (여러 번 지정 가능, 기본: 전체)')
+    parser.add_argument('--seeds', type=int, default=100, help='seed 개수')
+    parser.add_argument('--seed-start', type=int, default=0, help='첫 seed 값')
+    parser.add_argument('--sets', type=int, default=5, help='회차당 티켓 수')
+    parser.add_argument('--start', type=int, default=MIN_HISTORY, help='평가를 시작할 회차 위치 (이전은 이력으로만 사용)')
+    parser.add_argument('--workers', type=int, default=None, help='프로세스 수 (기본: CPU 수)')
+    parser.add_argument('--json', action='store_true', help='결과를 JSON으로 출력')
+    args = parser.parse_args(argv)
+    if args.seeds < 1:
+        parser.error('--seeds는 1 이상이어야 합니다.')
+    if args.sets < 1:
+        parser.error('--sets는 1 이상이어야 합니다.')
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers는 1 이상이어야 합니다.')
+
+    m = load_matrix(args.data)
+    if len(m) == 0:
+        parser.error('회차 데이터가 없습니다. 서버를 한 번 실행해 캐시를 만들거나 --data를 지정하세요.')
+    if not MIN_HISTORY <= args.start < len(m):
+        parser.error(f'--start는 {MIN_HISTORY}~{len(m) - 1} 사이여야 합니다.')
+    began = time.time()
+    report = backtest(m, args.strategy or sorted(STRATEGIES),
+                      range(args.seed_start, args.seed_start + args.seeds),
+                      args.sets, args.start, args.workers)
+    elapsed = time.time() - began
+
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+        return
+    print(f"{report['first_draw']}~{report['last_draw']}회 ({report['draws']}회차), "
+          f"회차당 {report['sets_per_draw']}장, seed {args.seeds}개, {elapsed:.1f}초")
+    print(f"{'전략':<10}{'당첨률(%)':>12}{'ROI 평균':>10}{'ROI p5':>10}{'ROI p50':>10}{'ROI p95':>10}  1~5등 횟수")
+    for name, s in report['strategies'].items():
+        roi = s['roi']
+        ranks = ' / '.join(str(s['rank_counts'][str(r)]) for r in range(1, 6))
+        print(f"{name:<10}{s['win_rate']['mean']:>12.3f}{roi['mean']:>10.2f}{roi['p5']:>10.2f}{roi['p50']:>10.2f}{roi['p95']:>10.2f}  {ranks}")
+
+
+if __name__ == '__main__':
+    main()
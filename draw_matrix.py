@@ -0,0 +1,294 @@
+import os
+import struct
+import zlib
+
+import numpy as np
+
+NUMBER_MAX = 45
+
+# 바이너리 캐시 형식: 64바이트 헤더 + 고정 길이 레코드 (메모리 매핑용)
+BINARY_MAGIC = b'LOTTOBIN'
+BINARY_VERSION = 1
+BINARY_HEADER_SIZE = 64
+_BINARY_HEADER = struct.Struct('<8sIIQ')  # magic, 형식 버전, 본문 crc32, 레코드 수
+RECORD_DTYPE = np.dtype([
+    ('mask', '<u8'),
+    ('date', '<M8[D]'),
+    ('prize_1st', '<i8'),
+    ('winners_1st', '<i8'),
+    ('draw_no', '<i4'),
+    ('numbers', 'u1', (6,)),
+    ('bonus', 'u1'),
+    ('_pad', 'V5'),
+])
+
+# 번호 n을 n번째 비트로 표현한 마스크 (홀수 번호 전체)
+ODD_MASK = np.uint64(sum(1 << n for n in range(1, NUMBER_MAX + 1, 2)))
+
+# 바이트 단위 비트 수 테이블 (numpy<2.0 에서 popcount 대용)
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(masks):
+    """uint64 배열 각 원소의 1비트 개수"""
+    masks = np.ascontiguousarray(masks, dtype=np.uint64)
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(masks).astype(np.int64)
+    table = _POPCOUNT_TABLE[masks.view(np.uint8)]
+    return table.reshape(masks.shape + (8,)).sum(axis=-1, dtype=np.int64)
+
+
+def numbers_to_masks(numbers):
+    """(N, k) 번호 배열을 회차별 64비트 마스크로 변환"""
+    bits = np.left_shift(np.uint64(1), np.asarray(numbers, dtype=np.uint64))
+    return np.bitwise_or.reduce(bits, axis=1)
+
+
+class DrawMatrix:
+    """회차 데이터의 열 지향(columnar) 표현
+
+    - numbers: (N, 6) uint8 당첨번호
+    - bonus: (N,) uint8 보너스 번호
+    - dates: (N,) datetime64[D] 추첨일
+    - masks: (N,) uint64 번호 n이 나왔으면 n번째 비트가 1
+    """
+
+    def __init__(self, draw_no, numbers, bonus, dates, prize_1st=None, winners_1st=None, masks=None):
+        self.draw_no = np.asarray(draw_no, dtype=np.int32)
+        self.numbers = np.asarray(numbers, dtype=np.uint8).reshape(-1, 6)
+        self.bonus = np.asarray(bonus, dtype=np.uint8)
+        self.dates = np.asarray(dates, dtype='datetime64[D]')
+        n = len(self.draw_no)
+        self.prize_1st = np.zeros(n, dtype=np.int64) if prize_1st is None else np.asarray(prize_1st, dtype=np.int64)
+        self.winners_1st = np.zeros(n, dtype=np.int64) if winners_1st is None else np.asarray(winners_1st, dtype=np.int64)
+        self.masks = numbers_to_masks(self.numbers) if masks is None else np.asarray(masks, dtype=np.uint64)
+
+    @classmethod
+    def from_draws(cls, draws):
+        """회차 dict 목록으로부터 생성"""
+        return cls(
+            draw_no=[d['draw_no'] for d in draws],
+            numbers=[d['numbers'] for d in draws],
+            bonus=[d['bonus'] for d in draws],
+            dates=[d['date'] or 'NaT' for d in draws],
+            prize_1st=[d.get('prize_1st', 0) for d in draws],
+            winners_1st=[d.get('winners_1st', 0) for d in draws],
+        )
+
+    @classmethod
+    def synthetic(cls, n, seed=None, start_date='2002-12-07'):
+        """무작위 추첨을 흉내 낸 가상 데이터 생성 (연구/성능 측정용)"""
+        rng = np.random.default_rng(seed)
+        picks = np.empty((n, 7), dtype=np.uint8)
+        chunk = 100_000
+        for start in range(0, n, chunk):
+            stop = min(start + chunk, n)
+            keys = rng.random((stop - start, NUMBER_MAX), dtype=np.float32)
+            picks[start:stop] = np.argpartition(keys, 7, axis=1)[:, :7] + 1
+        numbers = np.sort(picks[:, :6], axis=1)
+        dates = np.datetime64(start_date, 'D') + np.arange(n) * 7
+        return cls(np.arange(1, n + 1), numbers, picks[:, 6], dates)
+
+    def __len__(self):
+        return len(self.draw_no)
+
+    def __getitem__(self, key):
+        """슬라이스로 일부 회차만 선택 (복사 없이 view)"""
+        if not isinstance(key, slice):
+            raise TypeError('DrawMatrix는 슬라이스만 지원합니다')
+        return DrawMatrix(self.draw_no[key], self.numbers[key], self.bonus[key], self.dates[key],
+                          self.prize_1st[key], self.winners_1st[key], self.masks[key])
+
+    def take(self, index):
+        """위치 배열(또는 불리언 마스크)로 회차 선택 (복사)"""
+        return DrawMatrix(self.draw_no[index], self.numbers[index], self.bonus[index], self.dates[index],
+                          self.prize_1st[index], self.winners_1st[index], self.masks[index])
+
+    @classmethod
+    def concat(cls, parts):
+        """여러 DrawMatrix를 주어진 순서대로 이어 붙임"""
+        columns = ('draw_no', 'numbers', 'bonus', 'dates', 'prize_1st', 'winners_1st', 'masks')
+        return cls(*(np.concatenate([getattr(p, name) for p in parts]) for name in columns))
+
+    def between(self, first=None, last=None):
+        """회차 번호가 first~last 범위인 부분 (draw_no 오름차순 기준)"""
+        lo = 0 if first is None else int(np.searchsorted(self.draw_no, first, side='left'))
+        hi = len(self) if last is None else int(np.searchsorted(self.draw_no, last, side='right'))
+        return self[lo:hi]
+
+    def sums(self):
+        """회차별 당첨번호 합계"""
+        return self.numbers.sum(axis=1, dtype=np.int64)
+
+    def to_draws(self):
+        """전체 회차를 기존 dict 목록 형식으로 변환"""
+        dates = np.datetime_as_string(self.dates).tolist()
+        return [
+            {'draw_no': no, 'date': '' if date == 'NaT' else date, 'numbers': nums,
+             'bonus': bonus, 'prize_1st': prize, 'winners_1st': winners}
+            for no, date, nums, bonus, prize, winners in zip(
+                self.draw_no.tolist(), dates, self.numbers.tolist(), self.bonus.tolist(),
+                self.prize_1st.tolist(), self.winners_1st.tolist())
+        ]
+
+    def draw(self, i):
+        """i번째 회차를 기존 dict 형식으로 반환"""
+        date = self.dates[i]
+        return {
+            'draw_no': int(self.draw_no[i]),
+            'date': '' if np.isnat(date) else str(date),
+            'numbers': self.numbers[i].tolist(),
+            'bonus': int(self.bonus[i]),
+            'prize_1st': int(self.prize_1st[i]),
+            'winners_1st': int(self.winners_1st[i]),
+        }
+
+
+class NumberIndex:
+    """번호 -> 출현 회차 비트셋 역색인
+
+    - main[n]: 번호 n이 당첨번호로 나온 회차 위치 비트셋 (uint64 워드 배열)
+    - bonus[n]: 번호 n이 보너스 번호로 나온 회차 위치 비트셋
+    여러 번호 조건은 비트셋 AND 로 계산한다.
+    """
+
+    def __init__(self, m):
+        self.size = len(m)
+        words = max((self.size + 63) // 64, 1)
+        self.main = np.zeros((NUMBER_MAX + 1, words), dtype=np.uint64)
+        self.bonus = np.zeros((NUMBER_MAX + 1, words), dtype=np.uint64)
+        self.all = self._pack(np.ones(self.size, dtype=bool))
+        for n in range(1, NUMBER_MAX + 1):
+            self.main[n] = self._pack((m.masks >> np.uint64(n)) & np.uint64(1))
+            self.bonus[n] = self._pack(m.bonus == n)
+
+    def _pack(self, bits):
+        """(N,) 0/1 배열 -> uint64 워드 배열 (위치 i는 i//64 워드의 i%64 비트)"""
+        packed = np.zeros(self.main.shape[1] * 8, dtype=np.uint8)
+        packed[:(self.size + 7) // 8] = np.packbits(bits.astype(bool), bitorder='little')
+        return packed.view('<u8')
+
+    def match(self, numbers=(), bonus=None):
+        """numbers를 모두 포함하고 (bonus가 주어지면 보너스 번호도 일치하는) 회차 비트셋"""
+        words = self.all.copy()
+        for n in numbers:
+            words &= self.main[n]
+        if bonus is not None:
+            words &= self.bonus[bonus]
+        return words
+
+    def count(self, words):
+        """비트셋의 회차 수"""
+        return int(popcount(words).sum())
+
+    def positions(self, words):
+        """비트셋의 회차 위치 (오름차순)"""
+        bits = np.unpackbits(words.view(np.uint8), bitorder='little')[:self.size]
+        return np.flatnonzero(bits)
+
+    def last(self, words):
+        """비트셋에서 가장 뒤(최신) 회차 위치 (없으면 None)"""
+        nonzero = np.flatnonzero(words)
+        if len(nonzero) == 0:
+            return None
+        w = int(nonzero[-1])
+        return w * 64 + int(words[w]).bit_length() - 1
+
+
+def save_binary(m, path):
+    """고정 길이 레코드 바이너리 파일로 저장 (임시 파일에 쓴 뒤 교체)"""
+    records = np.zeros(len(m), dtype=RECORD_DTYPE)
+    records['mask'] = m.masks
+    records['date'] = m.dates
+    records['prize_1st'] = m.prize_1st
+    records['winners_1st'] = m.winners_1st
+    records['draw_no'] = m.draw_no
+    records['numbers'] = m.numbers
+    records['bonus'] = m.bonus
+    body = records.tobytes()
+    header = _BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, zlib.crc32(body), len(m))
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header.ljust(BINARY_HEADER_SIZE, b'\0'))
+        f.write(body)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_binary(path):
+    """바이너리 파일을 메모리 매핑해 복사 없이 DrawMatrix로 로드 (형식/체크섬 불일치 시 None)"""
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(BINARY_HEADER_SIZE)
+        if len(header) < BINARY_HEADER_SIZE:
+            return None
+        magic, version, crc, count = _BINARY_HEADER.unpack_from(header)
+        if magic != BINARY_MAGIC or version != BINARY_VERSION or count == 0:
+            return None
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode='r', offset=BINARY_HEADER_SIZE, shape=(count,))
+    except (OSError, ValueError):
+        return None
+    if zlib.crc32(records) != crc:
+        return None
+    return DrawMatrix(records['draw_no'], records['numbers'], records['bonus'], records['date'],
+                      records['prize_1st'], records['winners_1st'], masks=records['mask'])
+
+
+def _has_bool(values):
+    """중첩 목록에 bool 값이 섞여 있는지 (numpy는 True를 1로 바꿔 버림)"""
+    if isinstance(values, bool):
+        return True
+    if isinstance(values, (list, tuple)):
+        return any(_has_bool(v) for v in values)
+    return False
+
+
+def parse_tickets(tickets):
+    """티켓 목록을 검증해 (T, 6) 배열로 변환 (1~45 중복 없는 6개)
+
+    정수(또는 쿼리 문자열의 정수 표기)만 허용하고, 6.9나 true 같은 값은 잘라내지 않고 거부한다.
+    """
+    try:
+        arr = np.asarray(tickets)
+        if arr.dtype.kind == 'U':
+            arr = arr.astype(np.int64)
+        elif arr.dtype.kind == 'f':
+            if not np.all(np.isfinite(arr) & (arr == np.floor(arr))):
+                raise ValueError
+            # 범위 검사는 아래에서 (int64를 넘는 값도 범위 밖으로 남도록)
+            arr = np.clip(arr, 0, NUMBER_MAX + 1).astype(np.int64)
+        elif arr.dtype.kind not in 'iu' or _has_bool(tickets):
+            raise ValueError
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('티켓은 숫자 6개의 목록이어야 합니다.')
+    if arr.ndim == 1 and arr.size == 6:
+        arr = arr.reshape(1, 6)
+    if arr.ndim != 2 or arr.shape[1] != 6 or arr.shape[0] == 0:
+        raise ValueError('티켓은 숫자 6개의 목록이어야 합니다.')
+    if arr.min() < 1 or arr.max() > NUMBER_MAX:
+        raise ValueError('번호는 1~45 사이여야 합니다.')
+    arr = np.sort(arr, axis=1)
+    if np.any(np.diff(arr, axis=1) == 0):
+        raise ValueError('티켓에 중복된 번호가 있습니다.')
+    return arr.astype(np.uint8)
+
+
+def match_tickets(ticket_masks, masks, bonus):
+    """티켓 x 회차 일치 개수와 보너스 번호 포함 여부 (마스크 AND + popcount)"""
+    ticket_masks = np.asarray(ticket_masks, dtype=np.uint64)[:, None]
+    hits = popcount(ticket_masks & masks[None, :])
+    bonus_hit = ((ticket_masks >> bonus.astype(np.uint64)[None, :]) & np.uint64(1)).astype(bool)
+    return hits, bonus_hit
+
+
+def prize_ranks(hits, bonus_hit):
+    """일치 개수로 등수 계산 (0은 낙첨)"""
+    ranks = np.zeros(hits.shape, dtype=np.int8)
+    ranks[hits == 3] = 5
+    ranks[hits == 4] = 4
+    ranks[hits == 5] = 3
+    ranks[(hits == 5) & bonus_hit] = 2
+    ranks[hits == 6] = 1
+    return ranks
@@ -0,0 +1,16 @@
+# gunicorn 설정 (gunicorn app:app 실행 시 작업 디렉터리에서 자동으로 읽음)
+#
+# 워커가 여러 개여도 잠금 파일을 잡은 리더 워커 하나만 데이터를 수집하고,
+# 나머지 워커는 리더가 쓴 캐시 파일(메모리 매핑 바이너리 + 저널)을 읽기만 한다.
+
+
+def post_worker_init(worker):
+    """워커가 앱을 불러온 직후 백그라운드 수집 시작 (fork 이후라 스레드가 살아 있음)"""
+    from app import start_background_tasks
+    start_background_tasks()
+
+
+def worker_exit(server, worker):
+    """워커 종료 시 진행 중인 갱신을 마무리하고 리더 잠금을 넘김"""
+    from lotto_data import stop_background
+    stop_background()
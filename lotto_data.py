@@ -1,30 +1,198 @@
 import requests
+import bisect
+import hashlib
 import json
 import os
 import threading
 import time
-from datetime import datetime
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from functools import cached_property
+from requests.adapters import HTTPAdapter
 
-DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lotto_cache.json')
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import numpy as np
+
+from draw_matrix import DrawMatrix, NumberIndex, save_binary, load_binary
 
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lotto_cache.json')
+# 스냅샷 이후 추가된 회차를 한 줄씩 덧붙이는 저널 (NDJSON)
+JOURNAL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lotto_cache.journal')
+# 저널이 이 줄 수 이상 쌓이면 스냅샷으로 합침
+JOURNAL_COMPACT_LIMIT = 20
+# 빠른 기동용 바이너리 캐시 (JSON 캐시에서 생성, 메모리 매핑으로 로드)
+BINARY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lotto_cache.bin')
+# latest.json 조건부 요청용 검증값 (ETag/Last-Modified와 그때의 최신 회차 번호)
+LATEST_STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lotto_latest.json')
+# 여러 워커 프로세스 중 수집을 맡을 리더 선출용 잠금 파일
+LEADER_LOCK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lotto_leader.lock')
+# 리더가 아닌 워커가 캐시 파일 변경을 확인하는 최소 간격, 리더 자리를 다시 노려보는 간격 (초)
+SNAPSHOT_CHECK_INTERVAL = 5
+LEADER_RETRY_INTERVAL = 60
+# 팔로워가 받은 새로고침 요청을 리더에게 넘기는 파일 (요청 표시, 리더의 처리 결과)
+REFRESH_TRIGGER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lotto_refresh.request')
+REFRESH_RESULT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lotto_refresh.json')
+# 리더가 요청 파일을 확인하는 간격, 팔로워가 처리 결과를 기다리는 최대 시간 (초)
+REFRESH_TRIGGER_INTERVAL = 1
+REFRESH_FORWARD_TIMEOUT = 300
+
+# 외부 데이터 주소는 모두 환경 변수로 교체 가능 (테스트 시 로컬 대역 서버 주소)
 # smok95 GitHub Pages API (동행복권 데이터 미러)
-ALL_DATA_URL = 'https://smok95.github.io/lotto/results/all.json'
-LATEST_URL = 'https://smok95.github.io/lotto/results/latest.json'
+ALL_DATA_URL = os.environ.get('ALL_DATA_URL', 'https://smok95.github.io/lotto/results/all.json')
+LATEST_URL = os.environ.get('LATEST_URL', 'https://smok95.github.io/lotto/results/latest.json')
+
+# 동행복권 공식 API (빠진 회차 개별 수집용)
+DHLOTTERY_URL = os.environ.get('DHLOTTERY_URL', 'https://www.dhlottery.co.kr/common.do?method=getLottoNumber&drwNo={}')
 
-# 동행복권 공식 API (백업용)
-DHLOTTERY_URL = 'https://www.dhlottery.co.kr/common.do?method=getLottoNumber&drwNo={}'
+# 빠진 회차 동시 수집 설정
+BACKFILL_WORKERS = 8
+FETCH_TIMEOUT = 10
+FETCH_RETRIES = 3
+FETCH_BACKOFF = 0.5  # 재시도 대기 시간 (초, 시도마다 2배)
 
 FIRST_DRAW_DATE = datetime(2002, 12, 7)
+# 추첨 시각: FIRST_DRAW_DATE와 같은 요일(토요일) 20:45 한국 시간
+KST = timezone(timedelta(hours=9))
+DRAW_HOUR, DRAW_MINUTE = 20, 45
 
-# 데이터 수집 상태
-fetch_status = {'running': False, 'progress': 0, 'total': 0}
+# 자동 갱신 일정: 추첨 직후 구간에는 짧게, 최신 상태면 다음 추첨까지 대기
+UPDATE_WINDOW_DELAY = timedelta(minutes=5)  # 추첨 후 확인을 시작할 때까지
+UPDATE_WINDOW_LENGTH = timedelta(hours=6)   # 짧은 간격으로 확인하는 구간 길이
+UPDATE_POLL_INTERVAL = 120       # 구간 안에서 확인 간격 (초)
+UPDATE_CATCHUP_INTERVAL = 3600   # 구간이 지나도 새 회차가 없을 때 확인 간격 (초)
+UPDATE_BACKOFF_MAX = 3600        # 실패 시 재시도 대기 상한 (UPDATE_POLL_INTERVAL부터 2배씩)
 
+# 상태 조회용으로 보관하는 최근 갱신 작업 수
+REFRESH_JOB_HISTORY = 20
 
-def get_latest_draw_number():
-    """현재 날짜 기준 최신 회차 번호 계산"""
-    today = datetime.now()
-    days_diff = (today - FIRST_DRAW_DATE).days
-    return days_diff // 7 + 1
+# 데이터 수집 상태
+fetch_status = {'running': False, 'progress': 0, 'total': 0}
+# 자동 갱신 상태 (다음 확인 시각, 마지막 확인 시각과 결과, 연속 실패 횟수)
+update_status = {'next_run': None, 'last_run': None, 'last_outcome': None, 'failures': 0}
+
+# 연결을 재사용하는 공용 HTTP 세션
+_session = None
+_session_pool_size = 0
+_session_lock = threading.Lock()
+
+
+def _get_session(pool_size=BACKFILL_WORKERS):
+    """동시 요청 pool_size개까지 연결을 재사용하는 HTTP 세션 (더 큰 풀이 필요하면 어댑터를 교체)"""
+    global _session, _session_pool_size
+    if _session is None or _session_pool_size < pool_size:
+        with _session_lock:
+            if _session is None:
+                _session = requests.Session()
+            if _session_pool_size < pool_size:
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+                _session.mount('https://', adapter)
+                _session.mount('http://', adapter)
+                _session_pool_size = pool_size
+    return _session
+
+
+class DrawSnapshot:
+    """특정 버전의 회차 데이터 (교체만 되고 수정되지 않음)
+
+    회차 dict 목록과 DrawMatrix 중 하나만 주어지면 나머지는 처음 필요할 때 만든다.
+    """
+
+    def __init__(self, version, draws=None, matrix=None):
+        self.version = version
+        if draws is not None:
+            self.__dict__['draws'] = draws
+        if matrix is not None:
+            self.__dict__['matrix'] = matrix
+
+    @cached_property
+    def draws(self):
+        return self.matrix.to_draws()
+
+    @property
+    def latest_no(self):
+        return self.draws[-1]['draw_no'] if self.draws else 0
+
+    @cached_property
+    def key(self):
+        """데이터셋 키 (최신 회차 번호, 내용 해시)"""
+        raw = json.dumps(self.draws, ensure_ascii=False, separators=(',', ':'), sort_keys=True)
+        return self.latest_no, hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    @cached_property
+    def matrix(self):
+        """분석 커널용 열 지향 표현"""
+        return DrawMatrix.from_draws(self.draws)
+
+    @cached_property
+    def positions(self):
+        """회차 번호 -> 목록 위치"""
+        return {no: i for i, no in enumerate(self.matrix.draw_no.tolist())}
+
+    @cached_property
+    def prefix_index(self):
+        """회차 번호 문자열 접두사 -> 해당 회차 위치 배열 (오름차순)"""
+        index = {}
+        for i, no in enumerate(self.matrix.draw_no.tolist()):
+            text = str(no)
+            for k in range(1, len(text) + 1):
+                index.setdefault(text[:k], []).append(i)
+        return {prefix: np.array(pos, dtype=np.int64) for prefix, pos in index.items()}
+
+    @cached_property
+    def number_index(self):
+        """번호 -> 출현 회차 비트셋 역색인"""
+        return NumberIndex(self.matrix)
+
+    def get_draw(self, draw_no):
+        """회차 번호로 회차 dict 조회 (없으면 None)"""
+        i = self.positions.get(draw_no)
+        return None if i is None else self.draws[i]
+
+
+# 메모리 내 회차 데이터 저장소 (새 회차가 들어오면 스냅샷을 통째로 교체)
+_store_lock = threading.Lock()
+_snapshot = DrawSnapshot(0, [])
+_store_loaded = False
+_snapshot_listeners = []
+# 캐시 파일 쓰기 직렬화 (저널 추가/스냅샷 교체)
+_write_lock = threading.RLock()
+
+# 프로세스 역할: None(단독 실행), 'leader'(수집·파일 쓰기 담당), 'follower'(파일 변경만 따라감)
+_role = None
+_leader_lock_file = None
+_background_lock = threading.Lock()
+_background_started = False
+# 팔로워가 마지막으로 읽은 캐시 파일 상태
+_reload_lock = threading.Lock()
+_last_check = 0.0
+_seen_signature = None
+# 백그라운드 스레드 종료 신호, 리더의 자동 갱신 스레드
+_stop_event = threading.Event()
+_refresh_thread = None
+# 마지막 latest.json 확인 실패 사유 (성공하면 None)
+_last_check_error = None
+# 진행 중인 갱신 작업 (동시에 들어온 갱신 요청은 모두 이 작업 결과를 기다림), 최근 작업 목록
+_job_lock = threading.Lock()
+_current_job = None
+_jobs = OrderedDict()
+
+
+def draw_time(draw_no):
+    """draw_no 회차 추첨 시각 (KST)"""
+    first = FIRST_DRAW_DATE.replace(hour=DRAW_HOUR, minute=DRAW_MINUTE, tzinfo=KST)
+    return first + timedelta(weeks=draw_no - 1)
+
+
+def get_latest_draw_number(now=None):
+    """현재 시각(KST) 기준 추첨이 끝난 최신 회차 번호"""
+    now = now or datetime.now(KST)
+    return max((now - draw_time(1)) // timedelta(weeks=1) + 1, 0)
 
 
 def _convert_smok95_format(item):
@@ -52,13 +220,20 @@ def _convert_smok95_format(item):
 
 
 def fetch_all_from_api():
-    """smok95 API에서 전체 데이터를 한 번에 가져오기"""
+    """smok95 API에서 전체 데이터를 한 번에 가져오기 (받은 바이트 수로 진행률 표시)"""
     global fetch_status
-    fetch_status = {'running': True, 'progress': 0, 'total': 1}
+    fetch_status = {'running': True, 'progress': 0, 'total': 0}
     try:
-        resp = requests.get(ALL_DATA_URL, timeout=30)
-        raw_data = resp.json()
-        fetch_status = {'running': True, 'progress': 50, 'total': 100}
+        with _get_session().get(ALL_DATA_URL, timeout=30, stream=True) as resp:
+            resp.raise_for_status()
+            total = int(resp.headers.get('Content-Length') or 0)
+            chunks = []
+            for chunk in resp.iter_content(64 * 1024):
+                chunks.append(chunk)
+                # 압축 전송이면 Content-Length는 전송 바이트 기준
+                received = resp.raw.tell()
+                fetch_status = {'running': True, 'progress': received, 'total': max(total, received)}
+        raw_data = json.loads(b''.join(chunks))
 
         converted = [_convert_smok95_format(item) for item in raw_data]
         # 회차 번호 기준 중복 제거
@@ -69,7 +244,7 @@ def fetch_all_from_api():
                 seen.add(item['draw_no'])
                 result.append(item)
         result.sort(key=lambda x: x['draw_no'])
-        fetch_status = {'running': False, 'progress': 100, 'total': 100}
+        fetch_status = {'running': False, 'progress': fetch_status['progress'], 'total': fetch_status['total']}
         return result
     except Exception as e:
         print(f'API 오류: {e}')
@@ -77,8 +252,7 @@ def fetch_all_from_api():
         return []
 
 
-def load_cache():
-    """로컬 캐시 파일에서 데이터 로드"""
+def _load_snapshot_file():
     if os.path.exists(DATA_FILE):
         try:
             with open(DATA_FILE, 'r', encoding='utf-8') as f:
@@ -90,101 +264,714 @@ def load_cache():
     return []
 
 
-def save_cache(data):
-    """데이터를 로컬 캐시 파일에 저장"""
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
+def load_journal():
+    """저널에 기록된 회차 목록 (개행으로 끝나지 않은 마지막 줄은 쓰는 중이므로 무시)"""
+    try:
+        with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
+            lines = f.read().split('\n')[:-1]
+    except IOError:
+        return []
+    draws = []
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            draws.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return draws
+
+
+def _merge_draws(base, extra):
+    """회차 번호 기준으로 합치기 (같은 회차는 extra 우선)"""
+    if not extra:
+        return base
+    by_no = {d['draw_no']: d for d in base}
+    for d in extra:
+        by_no[d['draw_no']] = d
+    return [by_no[n] for n in sorted(by_no)]
+
+
+def load_cache():
+    """로컬 캐시(스냅샷 + 저널)에서 데이터 로드"""
+    return _merge_draws(_load_snapshot_file(), load_journal())
+
+
+def _write_json_atomic(path, data):
+    """임시 파일에 다 쓴 뒤 rename으로 교체 (읽는 쪽은 항상 완전한 파일만 봄)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
 
 
-def _fetch_draw_from_dhlottery(draw_no):
-    """동행복권 공식 API에서 특정 회차 데이터 가져오기"""
+def save_cache(data):
+    """전체 데이터를 새 스냅샷으로 저장하고 저널 비우기"""
+    with _write_lock:
+        _write_json_atomic(DATA_FILE, data)
+        save_binary_cache(DrawMatrix.from_draws(data))
+        if os.path.exists(JOURNAL_FILE):
+            os.remove(JOURNAL_FILE)
+
+
+def _append_journal(new_draws):
+    """새 회차만 저널 끝에 추가 (압축은 하지 않음)"""
+    with _write_lock:
+        with open(JOURNAL_FILE, 'ab') as f:
+            # 이전에 쓰다 만 줄이 있으면 새 줄과 섞이지 않도록 개행부터
+            if f.tell() > 0:
+                with open(JOURNAL_FILE, 'rb') as r:
+                    r.seek(-1, os.SEEK_END)
+                    if r.read(1) != b'\n':
+                        f.write(b'\n')
+            lines = ''.join(json.dumps(d, ensure_ascii=False) + '\n' for d in new_draws)
+            f.write(lines.encode('utf-8'))
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _compact_journal(all_draws):
+    """저널이 JOURNAL_COMPACT_LIMIT 회차 이상 쌓였으면 all_draws로 스냅샷 압축"""
+    with _write_lock:
+        if len(load_journal()) >= JOURNAL_COMPACT_LIMIT:
+            save_cache(all_draws)
+
+
+def append_draws(new_draws, all_draws):
+    """새 회차만 저널 끝에 추가 (저널이 쌓이면 all_draws로 스냅샷 압축)"""
+    _append_journal(new_draws)
+    _compact_journal(all_draws)
+
+
+def load_binary_cache():
+    """바이너리 캐시를 메모리 매핑으로 로드 (JSON 캐시보다 오래됐거나 손상되면 None)"""
     try:
-        resp = requests.get(DHLOTTERY_URL.format(draw_no), timeout=10)
-        data = resp.json()
-        if data.get('returnValue') != 'success':
+        if os.path.getmtime(BINARY_FILE) < os.path.getmtime(DATA_FILE):
             return None
-        return {
-            'draw_no': data['drwNo'],
-            'date': data['drwNoDate'],
-            'numbers': sorted([data[f'drwtNo{i}'] for i in range(1, 7)]),
-            'bonus': data['bnusNo'],
-            'prize_1st': data.get('firstWinamnt', 0),
-            'winners_1st': data.get('firstPrzwnerCo', 0),
-        }
-    except Exception as e:
-        print(f'동행복권 API 오류 (회차 {draw_no}): {e}')
-        return None
+    except OSError:
+        if not os.path.exists(BINARY_FILE):
+            return None
+    return load_binary(BINARY_FILE)
+
 
+def save_binary_cache(matrix):
+    """바이너리 캐시 저장 (실패해도 JSON 캐시는 유지)"""
+    try:
+        save_binary(matrix, BINARY_FILE)
+    except OSError as e:
+        print(f'바이너리 캐시 저장 실패: {e}')
 
-def fetch_all_draws():
-    """모든 회차 데이터 수집 (캐시 활용)"""
+
+def add_snapshot_listener(callback):
+    """새 스냅샷이 게시될 때마다 호출될 콜백 등록"""
+    _snapshot_listeners.append(callback)
+
+
+def _notify_listeners(snapshot):
+    for callback in list(_snapshot_listeners):
+        try:
+            callback(snapshot)
+        except Exception as e:
+            print(f'스냅샷 리스너 오류: {e}')
+
+
+def _publish_draws(draws, matrix=None):
+    """새 회차 목록(또는 DrawMatrix)을 다음 버전의 스냅샷으로 저장소에 교체"""
+    global _snapshot, _store_loaded
+    with _store_lock:
+        _snapshot = DrawSnapshot(_snapshot.version + 1, draws, matrix)
+        _store_loaded = True
+        snapshot = _snapshot
+    _notify_listeners(snapshot)
+    return snapshot
+
+
+def _cache_signature():
+    """캐시 파일들의 (수정 시각, 크기, inode) - 바뀌었는지만 값싸게 비교"""
+    signature = []
+    for path in (BINARY_FILE, JOURNAL_FILE, DATA_FILE):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_mtime_ns, st.st_size, st.st_ino))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _apply_journal(matrix, journal):
+    """바이너리 캐시 행렬에 저널 회차를 합친 DrawMatrix (같은 회차는 저널 우선)"""
+    by_no = {d['draw_no']: d for d in journal}
+    extra = DrawMatrix.from_draws([by_no[n] for n in sorted(by_no)])
+    if extra.draw_no[0] > matrix.draw_no[-1]:
+        return DrawMatrix.concat([matrix, extra])
+    # 중간 회차가 채워졌거나 고쳐진 경우: 겹치는 회차를 뺀 뒤 합쳐서 회차 순으로 정렬
+    merged = DrawMatrix.concat([matrix.take(~np.isin(matrix.draw_no, extra.draw_no)), extra])
+    return merged.take(np.argsort(merged.draw_no, kind='stable'))
+
+
+def _read_cache_files():
+    """캐시 파일에서 (회차 목록, DrawMatrix) 중 하나를 읽음 (없으면 (None, None))
+
+    바이너리 캐시는 메모리 매핑이라 같은 서버의 여러 워커가 페이지를 공유한다.
+    저널에 회차가 있으면 dict 목록으로 풀지 않고 행렬 뒤에 이어 붙인다.
+    """
+    matrix = load_binary_cache()
+    if matrix is not None:
+        journal = load_journal()
+        if journal:
+            return None, _apply_journal(matrix, journal)
+        return None, matrix
     cached = load_cache()
-    expected_latest = get_latest_draw_number()
+    return (cached or None), None
+
+
+def load_cache_matrix():
+    """캐시 파일 전체(바이너리 캐시 + 저널, 없거나 오래됐으면 JSON 캐시)를 DrawMatrix로 로드
+
+    서버 밖의 도구(backtest.py 등)가 서버와 같은 파일을 같은 규칙으로 읽을 때 사용한다.
+    """
+    cached, matrix = _read_cache_files()
+    return matrix if matrix is not None else DrawMatrix.from_draws(cached or [])
+
+
+def get_snapshot():
+    """현재 스냅샷 반환 (최초 호출 시 한 번만 캐시 파일 로드)
+
+    팔로워의 다시 읽기는 _follower_loop 가 맡으므로 요청 스레드에서는 파일을 읽지 않는다.
+    """
+    global _snapshot, _store_loaded, _seen_signature
+    if _store_loaded:
+        return _snapshot
+    loaded = None
+    with _store_lock:
+        if not _store_loaded:
+            _seen_signature = _cache_signature()
+            draws, matrix = _read_cache_files()
+            if draws or matrix is not None:
+                _snapshot = loaded = DrawSnapshot(_snapshot.version + 1, draws, matrix)
+                if matrix is None and _role != 'follower':
+                    save_binary_cache(loaded.matrix)
+            _store_loaded = True
+    if loaded:
+        _notify_listeners(loaded)
+    return _snapshot
+
+
+def _reload_if_changed(force=False):
+    """리더가 캐시 파일을 바꿨으면 다시 읽어 새 스냅샷으로 교체 (_follower_loop 에서 간격을 두고 호출)"""
+    global _last_check, _seen_signature
+    now = time.monotonic()
+    if not force and now - _last_check < SNAPSHOT_CHECK_INTERVAL:
+        return
+    # 강제로 다시 읽을 때는 진행 중인 확인이 끝나길 기다림
+    if not _reload_lock.acquire(blocking=force):
+        return
+    try:
+        _last_check = now
+        signature = _cache_signature()
+        if signature == _seen_signature:
+            return
+        _seen_signature = signature
+        draws, matrix = _read_cache_files()
+        if not draws and matrix is None:
+            return
+        candidate = DrawSnapshot(0, draws, matrix)
+        # 압축처럼 파일만 바뀌고 내용이 같으면 교체하지 않음
+        if candidate.key != _snapshot.key:
+            _publish_draws(draws, matrix)
+            print(f'[{os.getpid()}] 새 데이터 반영 ({candidate.latest_no}회차까지)')
+    finally:
+        _reload_lock.release()
+
+
+def try_become_leader():
+    """잠금 파일을 선점하면 리더 (fcntl이 없는 환경에서는 항상 리더)
+
+    잠금은 프로세스가 끝날 때 풀리므로 리더가 죽으면 다른 워커가 이어받을 수 있다.
+    """
+    global _role, _leader_lock_file
+    if _role == 'leader':
+        return True
+    if fcntl is not None:
+        f = open(LEADER_LOCK_FILE, 'a')
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            f.close()
+            _role = 'follower'
+            return False
+        _leader_lock_file = f
+    _role = 'leader'
+    return True
+
+
+def is_leader():
+    """이 프로세스가 수집을 맡고 있는지 (단독 실행도 포함)"""
+    return _role != 'follower'
+
 
-    if cached and len(cached) > 1000:
+def _fetch_draw_from_dhlottery(draw_no, url=None):
+    """동행복권 공식 API에서 특정 회차 데이터 가져오기
+
+    네트워크 오류/5xx 응답은 간격을 늘려가며 재시도하고,
+    아직 발표되지 않은 회차이거나 끝내 실패하면 None 반환
+    """
+    url = (url or DHLOTTERY_URL).format(draw_no)
+    for attempt in range(FETCH_RETRIES):
+        try:
+            resp = _get_session().get(url, timeout=FETCH_TIMEOUT)
+            resp.raise_for_status()
+            data = resp.json()
+            break
+        except (requests.RequestException, ValueError) as e:
+            if attempt + 1 == FETCH_RETRIES:
+                print(f'동행복권 API 오류 (회차 {draw_no}): {e}')
+                return None
+            time.sleep(FETCH_BACKOFF * 2 ** attempt)
+    if data.get('returnValue') != 'success':
+        return None
+    return {
+        'draw_no': data['drwNo'],
+        'date': data['drwNoDate'],
+        'numbers': sorted([data[f'drwtNo{i}'] for i in range(1, 7)]),
+        'bonus': data['bnusNo'],
+        'prize_1st': data.get('firstWinamnt', 0),
+        'winners_1st': data.get('firstPrzwnerCo', 0),
+    }
+
+
+def backfill_draws(missing, cached, url=None, workers=BACKFILL_WORKERS):
+    """빠진 회차들을 동시에 수집해 받는 대로 저널에 기록 (중간에 멈춰도 받은 회차는 남음)
+
+    저널 압축은 수집이 모두 끝난 뒤 한 번만 한다.
+    (합친 전체 목록, 새로 받은 회차 목록, 받지 못한 회차 번호 목록) 반환
+    """
+    global fetch_status
+    draws = list(cached)
+    added = []
+    failed = []
+    fetch_status = {'running': True, 'progress': 0, 'total': len(missing)}
+    # 작업 스레드 수만큼 연결을 유지하도록 세션 풀 크기를 맞춤
+    _get_session(workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_fetch_draw_from_dhlottery, n, url): n for n in missing}
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                draw = future.result()
+            except Exception as e:
+                print(f'동행복권 API 응답 오류 (회차 {futures[future]}): {e}')
+                draw = None
+            if draw:
+                bisect.insort(draws, draw, key=lambda d: d['draw_no'])
+                added.append(draw)
+                _append_journal([draw])
+                print(f"{draw['draw_no']}회차 데이터 추가 완료")
+            else:
+                failed.append(futures[future])
+            fetch_status = {'running': True, 'progress': done, 'total': len(missing)}
+    if added:
+        _compact_journal(draws)
+    fetch_status = {'running': False, 'progress': len(missing), 'total': len(missing)}
+    return draws, added, sorted(failed)
+
+
+def _load_latest_state():
+    try:
+        with open(LATEST_STATE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def check_latest():
+    """latest.json을 조건부 요청으로 확인 (변경이 없으면 본문 없는 304)
+
+    (최신 회차 번호, 새로 받은 회차 dict 또는 None) 반환, 요청 실패 시 (None, None)
+    """
+    global _last_check_error
+    state = _load_latest_state()
+    headers = {}
+    if state.get('draw_no'):
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+    try:
+        resp = _get_session().get(LATEST_URL, headers=headers, timeout=FETCH_TIMEOUT)
+        if resp.status_code == 304 and headers:
+            _last_check_error = None
+            return state['draw_no'], None
+        resp.raise_for_status()
+        draw = _convert_smok95_format(resp.json())
+    except Exception as e:
+        print(f'최신 회차 확인 오류: {e}')
+        _last_check_error = str(e)
+        return None, None
+    _last_check_error = None
+    with _write_lock:
+        _write_json_atomic(LATEST_STATE_FILE, {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'draw_no': draw['draw_no'],
+        })
+    return draw['draw_no'], draw
+
+
+def _refresh_latest():
+    """최신 회차만 먼저 확인하고 캐시보다 앞서 있을 때만 수집
+
+    latest.json이 바로 다음 회차면 받은 내용을 그대로 추가하고, 더 뒤처져 있으면
+    빠진 회차만 수집한다. 확인에 실패하면 날짜 계산으로 판단한다.
+    """
+    cached = list(get_snapshot().draws)
+    if not is_leader():
+        return cached
+    if not cached:
+        return _fetch_all_draws()
+    cached_max = cached[-1]['draw_no']
+    latest_no, latest = check_latest()
+    if latest_no is None:
+        return _fetch_all_draws() if get_latest_draw_number() > cached_max else cached
+    if latest_no <= cached_max:
+        return cached
+
+    print(f'새 회차 감지 ({cached_max} → {latest_no})')
+    if latest is not None and latest_no == cached_max + 1:
+        cached.append(latest)
+        append_draws([latest], cached)
+        _publish_draws(cached)
+        return cached
+    return _fetch_all_draws(latest_no)
+
+
+def _fetch_all_draws(expected_latest=None):
+    """모든 회차 데이터 수집 (캐시 활용, 빠진 회차만 동시 수집)
+
+    expected_latest: 최신 회차 번호 (없으면 날짜로 계산)
+    """
+    # 스냅샷의 목록은 다른 요청이 읽고 있으므로 복사본을 수정
+    cached = list(get_snapshot().draws)
+    # 팔로워는 리더가 쓴 파일만 따라감
+    if not is_leader():
+        return cached
+    if expected_latest is None:
+        expected_latest = get_latest_draw_number()
+
+    if cached:
         cached_nos = {d['draw_no'] for d in cached}
-        cached_max = max(cached_nos)
-        missing = [n for n in range(cached_max + 1, expected_latest + 1) if n not in cached_nos]
+        missing = [n for n in range(1, expected_latest + 1) if n not in cached_nos]
 
         if not missing:
             return cached
 
-        if len(missing) <= 3:
-            # 빠진 회차가 적으면 개별 수집 (동행복권 API 우선, 실패 시 전체 재수집)
-            updated = False
-            for draw_no in missing:
-                draw = _fetch_draw_from_dhlottery(draw_no)
-                if draw:
-                    cached.append(draw)
-                    updated = True
-                    print(f'{draw_no}회차 데이터 추가 완료')
-            if updated:
-                cached.sort(key=lambda x: x['draw_no'])
-                save_cache(cached)
-                return cached
-            # 개별 수집 실패 시 전체 재수집으로 폴백
-            print(f'개별 수집 실패, 전체 재수집 시도...')
-
-        # 빠진 회차가 많거나 개별 수집 실패 시 전체 재수집
-        print(f'캐시가 {len(missing)}회차 뒤처져 있어 전체 재수집합니다.')
+        # 절반 이상 비어 있으면 전체 파일을 한 번 받는 편이 빠름
+        if len(missing) <= expected_latest // 2:
+            print(f'빠진 회차 {len(missing)}개 수집 시작...')
+            draws, added, failed = backfill_draws(missing, cached)
+            if added:
+                _publish_draws(draws)
+                if failed:
+                    print(f'수집하지 못한 회차: {failed}')
+                return draws
+            # 하나도 받지 못하면 전체 재수집으로 폴백
+            print('개별 수집 실패, 전체 재수집 시도...')
 
     all_data = fetch_all_from_api()
     if all_data:
         save_cache(all_data)
+        _publish_draws(all_data)
         return all_data
     return cached if cached else []
 
 
 def get_draws():
-    """캐시된 데이터 반환 (없으면 전체 수집)"""
-    cached = load_cache()
+    """저장소의 회차 데이터 반환 (없으면 전체 수집)"""
+    cached = get_snapshot().draws
     if cached and len(cached) > 100:
         return cached
     return fetch_all_draws()
 
 
+class RefreshJob:
+    """갱신 작업 하나 (future로 결과 또는 예외를 기다림)"""
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.started_at = datetime.now(KST)
+        self.finished_at = None
+        self.future = Future()
+
+    def wait(self, timeout=None):
+        """작업 결과(회차 목록) 반환, 작업이 실패했으면 같은 예외를 발생"""
+        return self.future.result(timeout)
+
+    def to_dict(self):
+        info = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None,
+        }
+        if not self.future.done():
+            status = get_fetch_status()
+            info.update(status='running', progress=status['progress'], total=status['total'])
+        elif self.future.exception() is not None:
+            info.update(status='failed', error=str(self.future.exception()))
+        else:
+            draws = self.future.result()
+            info.update(status='done', total_draws=len(draws), latest=draws[-1]['draw_no'] if draws else 0)
+        return info
+
+
+def _claim_job(kind):
+    """진행 중인 작업이 있으면 그 작업을, 없으면 새 작업을 만들어 (작업, 새로 만들었는지) 반환"""
+    global _current_job
+    with _job_lock:
+        if _current_job is not None:
+            return _current_job, False
+        job = _current_job = RefreshJob(kind)
+        _jobs[job.id] = job
+        while len(_jobs) > REFRESH_JOB_HISTORY:
+            _jobs.popitem(last=False)
+        return job, True
+
+
+def _run_job(job, func, *args):
+    """작업 실행 후 진행 중 표시를 먼저 지우고 결과를 알림 (결과를 받은 쪽이 바로 새 작업을 시작할 수 있게)"""
+    global _current_job
+    try:
+        # 종료 중에는 리더 잠금을 놓은 뒤 파일을 쓰지 않도록 새로 시작하지 않음
+        if _stop_event.is_set():
+            raise RuntimeError('서버가 종료 중이라 갱신하지 않습니다.')
+        result, error = func(*args), None
+    except Exception as e:
+        result, error = None, e
+    finally:
+        job.finished_at = datetime.now(KST)
+        with _job_lock:
+            _current_job = None
+    if error is not None:
+        job.future.set_exception(error)
+    else:
+        job.future.set_result(result)
+
+
+def _coalesced(kind, func, *args):
+    """동시에 들어온 갱신 요청을 하나로 합쳐 실행하고 결과를 공유"""
+    job, created = _claim_job(kind)
+    if created:
+        _run_job(job, func, *args)
+    return job.wait()
+
+
+def refresh_latest():
+    """최신 회차만 먼저 확인하고 캐시보다 앞서 있을 때만 수집 (진행 중인 갱신이 있으면 그 결과를 공유)"""
+    return _coalesced('refresh', _refresh_latest)
+
+
+def fetch_all_draws(expected_latest=None):
+    """모든 회차 데이터 수집 (진행 중인 갱신이 있으면 그 결과를 공유)"""
+    return _coalesced('fetch_all', _fetch_all_draws, expected_latest)
+
+
+def _forward_refresh():
+    """팔로워: 리더에게 새로고침을 요청하고, 요청 이후에 시작한 처리가 끝나면 리더가 쓴 파일을 다시 읽음"""
+    requested_at = time.time()
+    with open(REFRESH_TRIGGER_FILE, 'a'):
+        pass
+    deadline = requested_at + REFRESH_FORWARD_TIMEOUT
+    while time.time() < deadline and not _stop_event.wait(REFRESH_TRIGGER_INTERVAL):
+        try:
+            with open(REFRESH_RESULT_FILE, 'r', encoding='utf-8') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if result.get('claimed_at', 0) < requested_at:
+            continue
+        if result.get('error'):
+            raise RuntimeError(f"리더 워커 갱신 실패: {result['error']}")
+        _reload_if_changed(force=True)
+        return list(get_snapshot().draws)
+    raise TimeoutError('리더 워커가 새로고침 요청을 처리하지 않았습니다.')
+
+
+def _refresh_trigger_loop():
+    """리더: 팔로워가 남긴 새로고침 요청 파일을 가져가 갱신하고 결과를 기록"""
+    while not _stop_event.wait(REFRESH_TRIGGER_INTERVAL):
+        try:
+            os.remove(REFRESH_TRIGGER_FILE)
+        except OSError:
+            continue
+        claimed_at = time.time()
+        error = None
+        try:
+            refresh_latest()
+        except Exception as e:
+            error = str(e)
+        _write_json_atomic(REFRESH_RESULT_FILE, {'claimed_at': claimed_at, 'finished_at': time.time(), 'error': error})
+
+
+def start_refresh_job():
+    """백그라운드에서 갱신 작업을 시작하고 바로 작업 반환 (이미 진행 중이면 그 작업)
+
+    팔로워 워커는 직접 수집하지 않고 리더에게 요청을 넘긴 뒤 결과를 기다린다.
+    """
+    if is_leader():
+        kind, func = 'refresh', _refresh_latest
+    else:
+        kind, func = 'forwarded', _forward_refresh
+    job, created = _claim_job(kind)
+    if created:
+        threading.Thread(target=_run_job, args=(job, func), daemon=True).start()
+    return job
+
+
+def get_refresh_job(job_id):
+    """최근 갱신 작업 조회 (없으면 None)"""
+    with _job_lock:
+        return _jobs.get(job_id)
+
+
+def _next_update_delay(latest_no, now):
+    """다음 확인까지 대기 시간 (초)
+
+    캐시가 최신이면 다음 추첨 직후 구간 시작까지, 새 회차를 기다리는 중이면
+    구간 안에서는 UPDATE_POLL_INTERVAL, 구간이 지났으면 UPDATE_CATCHUP_INTERVAL.
+    """
+    expected = get_latest_draw_number(now)
+    next_start = draw_time(expected + 1) + UPDATE_WINDOW_DELAY
+    until_next = max((next_start - now).total_seconds(), 0)
+    if latest_no >= expected:
+        return until_next
+    start = draw_time(expected) + UPDATE_WINDOW_DELAY
+    if now < start:
+        return (start - now).total_seconds()
+    if now < start + UPDATE_WINDOW_LENGTH:
+        return UPDATE_POLL_INTERVAL
+    # 다음 추첨 구간은 놓치지 않도록
+    return min(UPDATE_CATCHUP_INTERVAL, until_next)
+
+
 def _auto_refresh_loop():
-    """1시간마다 새 회차 데이터를 자동으로 확인·갱신"""
+    """추첨 일정에 맞춰 latest.json으로 새 회차를 확인·갱신 (stop_background()로 종료)
+
+    실패하면 UPDATE_POLL_INTERVAL부터 2배씩 UPDATE_BACKOFF_MAX까지 늘려 재시도한다.
+    """
     while True:
-        time.sleep(3600)
+        now = datetime.now(KST)
+        latest_no = get_snapshot().latest_no
+        if update_status['failures']:
+            delay = min(UPDATE_POLL_INTERVAL * 2 ** (update_status['failures'] - 1), UPDATE_BACKOFF_MAX)
+        elif latest_no:
+            delay = _next_update_delay(latest_no, now)
+        else:
+            # 초기 수집이 끝나기 전
+            delay = UPDATE_POLL_INTERVAL
+        update_status['next_run'] = (now + timedelta(seconds=delay)).isoformat(timespec='seconds')
+        if _stop_event.wait(delay):
+            break
+
+        now = datetime.now(KST)
+        update_status['last_run'] = now.isoformat(timespec='seconds')
         try:
-            cached = load_cache()
-            if not cached:
-                continue
-            cached_max = max(d['draw_no'] for d in cached)
-            expected = get_latest_draw_number()
-            if expected > cached_max:
-                print(f'[자동갱신] 새 회차 감지 ({cached_max} → {expected}), 데이터 수집 중...')
-                fetch_all_draws()
-                print('[자동갱신] 완료')
+            before = get_snapshot().latest_no
+            draws = refresh_latest()
+            after = draws[-1]['draw_no'] if draws else 0
         except Exception as e:
             print(f'[자동갱신] 오류: {e}')
-
-
-# 자동 갱신 백그라운드 스레드 시작
-_refresh_thread = threading.Thread(target=_auto_refresh_loop, daemon=True)
-_refresh_thread.start()
+            outcome = f'error: {e}'
+        else:
+            if after > before:
+                print(f'[자동갱신] 완료 ({before} → {after})')
+                outcome = f'updated: {before} → {after}'
+            elif after >= get_latest_draw_number(now):
+                outcome = 'up_to_date'
+            elif _last_check_error is not None:
+                outcome = f'error: {_last_check_error}'
+            else:
+                # 추첨은 끝났지만 아직 결과가 올라오지 않음
+                outcome = 'waiting'
+        update_status['last_outcome'] = outcome
+        update_status['failures'] = update_status['failures'] + 1 if outcome.startswith('error') else 0
+    update_status['next_run'] = None
+
+
+def _start_leader(on_leader):
+    global _refresh_thread
+    print(f'[{os.getpid()}] 데이터 수집 담당(리더)으로 시작')
+    _refresh_thread = threading.Thread(target=_auto_refresh_loop, daemon=True)
+    _refresh_thread.start()
+    threading.Thread(target=_refresh_trigger_loop, daemon=True).start()
+    if on_leader is not None:
+        threading.Thread(target=on_leader, daemon=True).start()
+
+
+def _follower_loop(on_leader):
+    """리더가 쓴 캐시 파일 변경을 따라가다가 리더가 사라지면 이어받음"""
+    waited = 0
+    while not _stop_event.wait(SNAPSHOT_CHECK_INTERVAL):
+        _reload_if_changed()
+        waited += SNAPSHOT_CHECK_INTERVAL
+        if waited >= LEADER_RETRY_INTERVAL:
+            waited = 0
+            if try_become_leader():
+                _reload_if_changed(force=True)
+                _start_leader(on_leader)
+                return
+
+
+def start_background(on_leader=None):
+    """백그라운드 작업 시작 (여러 번 호출해도 한 번만)
+
+    리더로 뽑힌 프로세스만 자동 갱신과 on_leader 작업(초기 수집 등)을 실행하고,
+    나머지 워커는 리더가 쓴 캐시 파일이 바뀌면 다시 읽기만 한다.
+    """
+    global _background_started
+    with _background_lock:
+        if _background_started:
+            return
+        _background_started = True
+    if try_become_leader():
+        _start_leader(on_leader)
+    else:
+        print(f'[{os.getpid()}] 다른 워커가 수집을 담당하므로 캐시 파일만 따라갑니다')
+        threading.Thread(target=_follower_loop, args=(on_leader,), daemon=True).start()
+
+
+def stop_background(timeout=10):
+    """백그라운드 스레드에 종료를 알리고, 진행 중인 갱신이 끝나면 리더 잠금을 놓음"""
+    global _leader_lock_file
+    _stop_event.set()
+    if _refresh_thread is not None and _refresh_thread is not threading.current_thread():
+        _refresh_thread.join(timeout)
+    # 새로고침 API나 초기 수집 작업이 아직 파일을 쓰는 중이면 끝날 때까지 대기
+    job = _current_job
+    if job is not None:
+        try:
+            job.future.exception(timeout)
+        except TimeoutError:
+            print(f'[{os.getpid()}] 진행 중인 갱신이 {timeout}초 안에 끝나지 않았습니다')
+    if _leader_lock_file is not None:
+        # 잠금 파일을 닫으면 flock이 풀려 다른 워커가 바로 이어받을 수 있음
+        _leader_lock_file.close()
+        _leader_lock_file = None
 
 
 def get_fetch_status():
     return fetch_status
+
+
+def get_update_status():
+    """자동 갱신 상태 (리더가 아니면 일정 정보 없음)"""
+    return dict(update_status, role=_role or 'standalone')
+
+
+if __name__ == '__main__':
+    # 배포 빌드 단계에서 JSON 캐시로부터 바이너리 캐시를 미리 생성
+    data = _load_snapshot_file()
+    if data:
+        save_binary_cache(DrawMatrix.from_draws(data))
+        print(f'바이너리 캐시 생성 완료: {len(data)}회차 → {BINARY_FILE}')
@@ -165,9 +165,11 @@ def load_store_cache():
 
 
 def save_store_cache(data):
-    """판매점 데이터를 캐시에 저장"""
-    with open(STORE_CACHE_FILE, 'w', encoding='utf-8') as f:
+    """판매점 데이터를 캐시에 저장 (다른 워커가 쓰다 만 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체)"""
+    tmp_path = STORE_CACHE_FILE + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, STORE_CACHE_FILE)
 
 
 def fetch_store_data():
@@ -0,0 +1,74 @@
+"""통계 분석 결과가 최적화 이전 구현과 같은지 고정된 결과로 검증
+
+baseline_analysis.json 은 최초 커밋의 analysis.get_full_analysis() (예측 번호 제외)를
+저장소에 포함된 lotto_cache.json 으로 계산해 둔 것이다.
+- full: 전체 회차 결과
+- prefix_sha1: 앞에서부터 i개 회차 결과의 SHA-1 (i = 1..N)
+최초 구현에는 간격 분석이 없으므로 'gaps'는 gap_analysis()와 따로 비교한다.
+"""
+import hashlib
+import json
+import os
+
+import pytest
+
+import analysis
+from draw_matrix import DrawMatrix
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def canonical(result):
+    return json.dumps(result, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def digest(result):
+    return hashlib.sha1(canonical(result).encode('utf-8')).hexdigest()
+
+
+def without_gaps(result):
+    return {k: v for k, v in result.items() if k != 'gaps'}
+
+
+@pytest.fixture(scope='module')
+def baseline():
+    with open(os.path.join(HERE, 'baseline_analysis.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope='module')
+def matrix(baseline):
+    """고정 결과를 만들 때와 같은 회차만 추림 (이후 추가된 회차는 제외)"""
+    with open(os.path.join(os.path.dirname(HERE), 'lotto_cache.json'), encoding='utf-8') as f:
+        by_no = {d['draw_no']: d for d in json.load(f)}
+    draws = [by_no[n] for n in baseline['draw_nos']]
+    assert digest(draws) == baseline['draws_sha1']
+    return DrawMatrix.from_draws(draws)
+
+
+def test_base_analysis_matches_baseline(baseline, matrix):
+    result = analysis.get_base_analysis(matrix)
+
+    assert json.loads(canonical(without_gaps(result))) == baseline['full']
+    assert result['gaps'] == analysis.gap_analysis(matrix)
+
+
+def test_prefix_summaries_match_baseline(baseline, matrix):
+    prefix = analysis.PrefixStats(matrix)
+    mismatched = [i for i in range(1, len(matrix) + 1)
+                  if digest(without_gaps(prefix.summary(i))) != baseline['prefix_sha1'][i - 1]]
+
+    assert mismatched == []
+    for i in (1, 2, 51, len(matrix) // 2, len(matrix)):
+        assert prefix.summary(i)['gaps'] == analysis.gap_analysis(matrix[:i])
+
+
+def test_incremental_state_matches_baseline(baseline, matrix):
+    start = len(matrix) - 30
+    stats = analysis.IncrementalStats.from_matrix(matrix[:start])
+    extended = stats.extend(matrix)
+
+    assert stats.total == start
+    assert digest(without_gaps(stats.summary())) == baseline['prefix_sha1'][start - 1]
+    assert json.loads(canonical(without_gaps(extended.summary()))) == baseline['full']
+    assert extended.summary()['gaps'] == analysis.gap_analysis(matrix)
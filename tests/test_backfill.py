@@ -0,0 +1,235 @@
+"""빠진 회차 동시 수집을 로컬 대역 서버(http.server)로 검증"""
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+import lotto_data
+
+
+def make_draw(n):
+    """회차 번호로 항상 같은 당첨번호를 만드는 가짜 회차"""
+    picks = random.Random(n).sample(range(1, 46), 7)
+    return {'draw_no': n, 'numbers': sorted(picks[:6]), 'bonus': picks[6]}
+
+
+class StandInServer:
+    """동행복권 회차 API와 smok95 all.json 형식을 흉내 내는 서버
+
+    - fail_first: 첫 요청에 503을 주는 회차
+    - always_fail: 항상 500을 주는 회차
+    - on_request: 회차 요청을 처리하기 전에 호출 (회차 번호 인자)
+    """
+
+    def __init__(self):
+        self.delay = 0
+        self.fail_first = set()
+        self.always_fail = set()
+        self.on_request = None
+        self.hits = Counter()
+        self.inflight = 0
+        self.max_inflight = 0
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == '/all.json':
+                    self._send(200, [{'draw_no': d['draw_no'], 'date': '2002-12-07T00:00:00Z',
+                                      'numbers': d['numbers'], 'bonus_no': d['bonus']}
+                                     for d in map(make_draw, range(1, 11))])
+                    return
+                n = int(parse_qs(url.query)['drwNo'][0])
+                with server.lock:
+                    server.hits[n] += 1
+                    first_hit = server.hits[n] == 1
+                    server.inflight += 1
+                    server.max_inflight = max(server.max_inflight, server.inflight)
+                try:
+                    if server.on_request is not None:
+                        server.on_request(n)
+                    time.sleep(server.delay)
+                    if n in server.always_fail or (first_hit and n in server.fail_first):
+                        self._send(503 if first_hit else 500, {})
+                        return
+                    d = make_draw(n)
+                    payload = {'returnValue': 'success', 'drwNo': n, 'drwNoDate': '2002-12-07',
+                               'bnusNo': d['bonus'], 'firstWinamnt': 0, 'firstPrzwnerCo': 0}
+                    payload.update({f'drwtNo{i}': v for i, v in enumerate(d['numbers'], 1)})
+                    self._send(200, payload)
+                finally:
+                    with server.lock:
+                        server.inflight -= 1
+
+        return Handler
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def server():
+    s = StandInServer()
+    yield s
+    s.close()
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    """캐시 파일을 임시 디렉터리로 돌리고 재시도 대기를 줄임"""
+    for name, filename in [('DATA_FILE', 'lotto_cache.json'), ('JOURNAL_FILE', 'lotto_cache.journal'),
+                           ('BINARY_FILE', 'lotto_cache.bin'), ('LATEST_STATE_FILE', 'lotto_latest.json')]:
+        monkeypatch.setattr(lotto_data, name, str(tmp_path / filename))
+    monkeypatch.setattr(lotto_data, 'FETCH_BACKOFF', 0.01)
+    monkeypatch.setattr(lotto_data, 'fetch_status', {'running': False, 'progress': 0, 'total': 0})
+    return tmp_path
+
+
+def backfill(server, missing, **kwargs):
+    return lotto_data.backfill_draws(missing, [], url=server.url + '/draw?drwNo={}', **kwargs)
+
+
+def test_backfill_fetches_concurrently(server, store):
+    server.delay = 0.05
+    missing = list(range(1, 41))
+    started = time.time()
+    draws, added, failed = backfill(server, missing, workers=8)
+    elapsed = time.time() - started
+
+    assert failed == []
+    assert len(added) == 40
+    assert [d['draw_no'] for d in draws] == missing
+    assert draws[9]['numbers'] == make_draw(10)['numbers']
+    assert server.max_inflight > 1
+    # 순차로 받았다면 최소 40 * 0.05초
+    assert elapsed < 40 * server.delay
+
+
+def test_backfill_retries_after_503(server, store):
+    server.fail_first = {3, 6, 9}
+    draws, added, failed = backfill(server, list(range(1, 11)))
+
+    assert failed == []
+    assert [d['draw_no'] for d in draws] == list(range(1, 11))
+    assert all(server.hits[n] == 2 for n in server.fail_first)
+    assert all(server.hits[n] == 1 for n in range(1, 11) if n not in server.fail_first)
+
+
+def run_until_last_request(server, missing, last, check):
+    """마지막 회차 요청을 붙잡아 둔 채 수집 도중 상태를 check()로 확인한 뒤 마저 끝냄"""
+    reached, release = threading.Event(), threading.Event()
+
+    def hold(n):
+        if n == last:
+            reached.set()
+            release.wait(5)
+
+    server.on_request = hold
+    result = {}
+    worker = threading.Thread(target=lambda: result.update(zip(('draws', 'added', 'failed'), backfill(server, missing))))
+    worker.start()
+    try:
+        assert reached.wait(5)
+        # 앞선 회차의 응답 처리(저널 기록, 진행률 갱신)가 끝날 때까지 잠시 기다림
+        deadline = time.time() + 5
+        while not check() and time.time() < deadline:
+            time.sleep(0.01)
+        assert check()
+        assert worker.is_alive()
+    finally:
+        release.set()
+        worker.join(5)
+    return result
+
+
+def test_backfill_persists_partial_progress(server, store):
+    server.always_fail = {5}
+    missing = list(range(1, 11))
+    journaled = lambda: sorted(d['draw_no'] for d in lotto_data.load_journal())
+    result = run_until_last_request(server, missing, 10, lambda: journaled() == [1, 2, 3, 4, 6, 7, 8, 9])
+
+    assert result['failed'] == [5]
+    assert journaled() == [1, 2, 3, 4, 6, 7, 8, 9, 10]
+    assert [d['draw_no'] for d in lotto_data.load_cache()] == [1, 2, 3, 4, 6, 7, 8, 9, 10]
+    assert server.hits[5] == lotto_data.FETCH_RETRIES
+
+
+def test_backfill_reports_progress(server, store):
+    missing = list(range(1, 21))
+    status = lotto_data.get_fetch_status
+    run_until_last_request(server, missing, 20, lambda: status() == {'running': True, 'progress': 19, 'total': 20})
+
+    assert status() == {'running': False, 'progress': 20, 'total': 20}
+
+
+def test_upstream_urls_from_environment(server):
+    env = dict(os.environ,
+               ALL_DATA_URL=server.url + '/all.json',
+               LATEST_URL=server.url + '/latest.json',
+               DHLOTTERY_URL=server.url + '/draw?drwNo={}')
+    script = ('import json, lotto_data as L; '
+              'print(json.dumps([L.ALL_DATA_URL, L.LATEST_URL, L.DHLOTTERY_URL, len(L.fetch_all_from_api())]))')
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out = subprocess.run([sys.executable, '-c', script], cwd=root, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    all_url, latest_url, draw_url, count = json.loads(out.strip().splitlines()[-1])
+
+    assert (all_url, latest_url, draw_url) == (env['ALL_DATA_URL'], env['LATEST_URL'], env['DHLOTTERY_URL'])
+    assert count == 10
+
+
+def test_journal_rows_extend_binary_cache(store):
+    draws = [dict(make_draw(n), date='2002-12-07', prize_1st=0, winners_1st=0) for n in range(1, 13)]
+    lotto_data.save_cache(draws[:6] + draws[7:10])
+    # 뒤에 붙는 회차와 중간에 빠졌던 회차(7)를 함께 저널에 기록
+    lotto_data.append_draws([draws[10], draws[6], draws[11]], draws)
+    cached, matrix = lotto_data._read_cache_files()
+
+    assert cached is None
+    assert matrix.to_draws() == lotto_data.load_cache() == draws
+
+
+def test_backfill_compacts_journal_once(server, store, monkeypatch):
+    compactions = []
+    save_cache = lotto_data.save_cache
+    monkeypatch.setattr(lotto_data, 'save_cache', lambda data: (compactions.append(len(data)), save_cache(data)))
+    missing = list(range(1, lotto_data.JOURNAL_COMPACT_LIMIT * 2 + 6))
+    draws, added, failed = backfill(server, missing, workers=4)
+
+    assert failed == []
+    assert compactions == [len(missing)]
+    assert lotto_data.load_journal() == []
+    assert [d['draw_no'] for d in lotto_data.load_cache()] == missing
+
+
+def test_session_pool_matches_workers(server, store):
+    backfill(server, list(range(1, 4)), workers=lotto_data.BACKFILL_WORKERS + 8)
+    adapter = lotto_data._get_session().get_adapter(server.url)
+
+    assert adapter._pool_maxsize >= lotto_data.BACKFILL_WORKERS + 8